@@ -0,0 +1,145 @@
+"""
+Async mode for the API routes
+With DATABASE_ASYNC=true every endpoint that takes `db: Session` is served as
+an async def handler: its ORM code runs through AsyncSession.run_sync on the
+event loop instead of occupying a threadpool slot. Dependencies that take
+`db` (authentication, conditional GET) are served the same way and share the
+request's AsyncSession, and the response model is validated and serialised
+once, inside run_sync, while lazy loads can still reach the database.
+"""
+import copy
+import functools
+import inspect
+from typing import Any, Callable, Dict, Optional
+from fastapi import Depends, Response, params
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from fastapi.utils import is_body_allowed_for_status_code
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, get_db
+
+# Injected into wrapped endpoints: the response whose headers and status code
+# dependencies and handlers set, merged into the response built here
+SUB_RESPONSE = "async_sub_response"
+
+# Dependency -> its async-session version, so FastAPI's per-request dependency
+# cache still sees one callable per dependency
+_async_dependencies: Dict[Callable, Callable] = {}
+
+
+def _unwrap(value):
+    return value.value if isinstance(value, DefaultPlaceholder) else value
+
+
+def _async_depends(depends: params.Depends) -> params.Depends:
+    """Depends() (or Security()) marker pointing at the async-session version of its dependency"""
+    if depends.dependency is None:
+        return depends
+    dependency = async_dependency(depends.dependency)
+    if dependency is depends.dependency:
+        return depends
+    depends = copy.copy(depends)
+    depends.dependency = dependency
+    return depends
+
+
+def _with_async_dependencies(signature: inspect.Signature) -> inspect.Signature:
+    """`signature` with Depends() defaults replaced by their async-session versions"""
+    return signature.replace(parameters=[
+        param.replace(default=_async_depends(param.default)) if isinstance(param.default, params.Depends) else param
+        for param in signature.parameters.values()
+    ])
+
+
+def async_dependency(dependency: Callable) -> Callable:
+    """The version of a dependency that reads the database through the request's AsyncSession"""
+    if dependency in _async_dependencies:
+        return _async_dependencies[dependency]
+    result = dependency
+    if dependency is not get_db and inspect.isfunction(dependency) and not (
+        inspect.iscoroutinefunction(dependency) or inspect.isgeneratorfunction(dependency)
+    ):
+        result = run_in_async_session(dependency)
+    _async_dependencies[dependency] = result
+    return result
+
+
+def run_in_async_session(endpoint: Callable, response_model: Any = None, **response_options) -> Callable:
+    """
+    Wrap a sync `db: Session` endpoint or dependency as an async def one. With a
+    `response_model`, the wrapper returns the finished response (see APIRoute
+    for `response_options`), so FastAPI does not serialise it again outside run_sync.
+    """
+    original = inspect.signature(endpoint)
+    signature = _with_async_dependencies(original)
+    if "db" not in signature.parameters or inspect.iscoroutinefunction(endpoint):
+        if signature == original:
+            return endpoint
+
+        # Runs as before; only its dependencies change
+        @functools.wraps(endpoint)
+        def rewired(*args, **kwargs):
+            return endpoint(*args, **kwargs)
+
+        rewired.__signature__ = signature
+        return rewired
+    adapter = TypeAdapter(response_model) if response_model is not None else None
+    response_class = response_options.pop("response_class", JSONResponse)
+    status_code: Optional[int] = response_options.pop("status_code", None)
+    dump_options = {
+        "include": response_options.get("response_model_include"),
+        "exclude": response_options.get("response_model_exclude"),
+        "by_alias": response_options.get("response_model_by_alias", True),
+        "exclude_unset": response_options.get("response_model_exclude_unset", False),
+        "exclude_defaults": response_options.get("response_model_exclude_defaults", False),
+        "exclude_none": response_options.get("response_model_exclude_none", False),
+    }
+
+    # FastAPI injects the sub-response into one parameter only: reuse the endpoint's own
+    response_name = next((name for name, param in signature.parameters.items() if param.annotation is Response), None)
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, db: AsyncSession, **kwargs):
+        sub_response: Optional[Response] = kwargs.get(response_name) if response_name else kwargs.pop(SUB_RESPONSE, None)
+
+        def call(session):
+            result = endpoint(*args, db=session, **kwargs)
+            if adapter is None or result is None or isinstance(result, Response):
+                return result, False
+            value = adapter.validate_python(result, from_attributes=True)
+            return adapter.dump_python(value, mode="json", **dump_options), True
+
+        result, serialised = await db.run_sync(call)
+        if not serialised:
+            return result
+        # As FastAPI builds the response for a returned value
+        current_status = sub_response.status_code or status_code
+        response = response_class(result, **({"status_code": current_status} if current_status else {}))
+        if not is_body_allowed_for_status_code(response.status_code):
+            response.body = b""
+        response.headers.raw.extend(sub_response.headers.raw)
+        return response
+
+    parameters = [
+        param.replace(default=Depends(get_async_db), annotation=AsyncSession) if name == "db" else param
+        for name, param in signature.parameters.items()
+    ]
+    if adapter is not None and response_name is None:
+        parameters.append(inspect.Parameter(SUB_RESPONSE, inspect.Parameter.KEYWORD_ONLY, annotation=Response))
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    return wrapper
+
+
+class AsyncSessionRoute(APIRoute):
+    """APIRoute that serves `db: Session` endpoints and dependencies through run_in_async_session"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        response_model = _unwrap(kwargs.get("response_model"))
+        response_options = {
+            name: _unwrap(value) for name, value in kwargs.items()
+            if name.startswith("response_model_") or name in ("response_class", "status_code")
+        }
+        kwargs["dependencies"] = [_async_depends(depends) for depends in kwargs.get("dependencies") or ()]
+        super().__init__(path, run_in_async_session(endpoint, response_model, **response_options), **kwargs)
@@ -2,15 +2,27 @@
 Authentication utilities for GearGuard
 Handles JWT tokens and password hashing
 """
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from itertools import chain
 from typing import Optional
 from jose import JWTError, jwt
-import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
+from sqlalchemy.util.concurrency import await_only, in_greenlet
 import models
+import password_hashing
+import versions
 from database import get_db
+from settings import settings
+from ttl_cache import TTLCache
 
 # Security configuration
 SECRET_KEY = "your-secret-key-change-this-in-production"  # TODO: Move to environment variable
@@ -20,18 +32,185 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Authenticated principals keyed by user id (with the "users" version they were
+# read at), and payloads of already verified tokens
+user_cache = TTLCache(maxsize=settings.auth_user_cache_size, ttl=settings.auth_user_cache_ttl)
+token_cache = TTLCache(maxsize=settings.auth_token_cache_size, ttl=settings.auth_token_cache_ttl)
+USERS_VERSION = "users"
+USERS_CHANGED_KEY = "auth.users_changed"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Detached snapshot of the authenticated user"""
+    id: int
+    name: str
+    email: str
+    profile_picture: Optional[str]
+    role: str
+    is_active: bool
+    is_admin: bool
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            profile_picture=user.profile_picture,
+            role=user.role or "Standard User",
+            is_active=bool(user.is_active),
+            is_admin=bool(user.is_admin),
+            created_at=user.created_at,
+        )
+
+
+class UsersVersion:
+    """
+    The "users" version counter (bumped by every write to the table) as last
+    read. Local commits that change users drop it at once; other workers'
+    changes are noticed when it is re-read, at most every `check_interval` seconds.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._value: Optional[int] = None
+        self._checked_at = 0.0
+
+    def get(self, db: Session) -> int:
+        now = time.monotonic()
+        if self._value is None or now - self._checked_at >= self.check_interval:
+            self._value = versions.get(db, USERS_VERSION)
+            self._checked_at = now
+        return self._value
+
+    def invalidate(self):
+        self._value = None
+
+
+users_version = UsersVersion(settings.auth_user_cache_check_interval)
+
+
+@event.listens_for(Session, "after_flush")
+def _note_user_changes(session: Session, flush_context):
+    if any(isinstance(obj, models.User) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info[USERS_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_user_statement(state):
+    if (state.is_update or state.is_delete) and state.bind_mapper is inspect(models.User):
+        state.session.info[USERS_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_cached_users(session: Session):
+    """Principals cached before a committed user change no longer match the version"""
+    if session.info.pop(USERS_CHANGED_KEY, False):
+        users_version.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_user_changes(session: Session):
+    session.info.pop(USERS_CHANGED_KEY, None)
+
+
+def cache_stats() -> dict:
+    return {"users": user_cache.stats(), "tokens": token_cache.stats()}
+
+
+# bcrypt runs in a dedicated process pool so login storms don't starve other requests.
+# At most workers + queue_limit hashes may be in flight; beyond that callers get a 503.
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_pool_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(
+    max(settings.password_hash_workers, 1) + settings.password_hash_queue_limit
+)
+# Sync endpoints wait for their hash on a threadpool thread (anyio's limiter, 40 threads
+# unless configured otherwise). Those waits may use at most password_hash_thread_share
+# of the threadpool, so a login storm leaves threads for other requests.
+DEFAULT_THREADPOOL_SIZE = 40
+
+
+def _thread_slots(threadpool_size: int) -> threading.BoundedSemaphore:
+    return threading.BoundedSemaphore(max(1, int(threadpool_size * settings.password_hash_thread_share)))
+
+
+_hash_thread_slots = _thread_slots(DEFAULT_THREADPOOL_SIZE)
+
+
+def size_hash_thread_slots(threadpool_size: int):
+    """Size the threadpool share for hash waits to the running threadpool (app startup)"""
+    global _hash_thread_slots
+    _hash_thread_slots = _thread_slots(threadpool_size)
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        with _hash_pool_lock:
+            if _hash_pool is None:
+                _hash_pool = ProcessPoolExecutor(
+                    max_workers=settings.password_hash_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _hash_pool
+
+
+def _run_hashing(fn, *args):
+    """
+    Run a password_hashing function in the pool (inline when the pool is disabled).
+    In async mode endpoints run on the event loop inside AsyncSession.run_sync's
+    greenlet, so the result is awaited there instead of blocking the loop.
+    """
+    if settings.password_hash_workers <= 0:
+        if in_greenlet():
+            return await_only(asyncio.get_running_loop().run_in_executor(None, fn, *args))
+        return fn(*args)
+    # Awaited in async mode; otherwise the caller's thread waits and needs a thread slot too
+    slots = [_hash_slots] if in_greenlet() else [_hash_slots, _hash_thread_slots]
+    acquired = []
+    try:
+        for slot in slots:
+            if not slot.acquire(blocking=False):
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many concurrent sign-ins, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            acquired.append(slot)
+        future = _get_hash_pool().submit(fn, *args)
+        if in_greenlet():
+            return await_only(asyncio.wrap_future(future))
+        return future.result()
+    finally:
+        for slot in acquired:
+            slot.release()
+
+
+def shutdown_hash_pool():
+    """Stop the password hashing workers (app shutdown)"""
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return _run_hashing(password_hashing.check_password, plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
     # bcrypt automatically handles the 72 byte limit
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+    return _run_hashing(password_hashing.hash_password, password, settings.bcrypt_rounds)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with a different bcrypt cost than configured"""
+    return password_hashing.hash_rounds(hashed_password) != settings.bcrypt_rounds
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -47,10 +226,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def decode_token(token: str) -> dict:
+    """Decode a JWT, skipping signature verification for tokens verified before"""
+    payload = token_cache.get(token)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return payload
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    token_cache.set(token, payload)
+    return payload
+
+
 def verify_token(token: str) -> dict:
     """Verify and decode a JWT token"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         return payload
     except JWTError:
         raise HTTPException(
@@ -69,10 +258,16 @@ def authenticate_user(db: Session, email: str, password: str):
         return False
     if not verify_password(password, user.password_hash):
         return False
+    if not user.is_active:
+        return False
+    if needs_rehash(user.password_hash):
+        # Upgrade (or downgrade) the stored hash to the configured cost
+        user.password_hash = get_password_hash(password)
+        db.commit()
     return user
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
     """Get the current authenticated user from JWT token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -81,19 +276,27 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user is None:
+        payload = decode_token(token)
+        user_id = int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
         raise credentials_exception
     
-    return user
-
-
-
+    # Read the version before the row, so no principal is tagged with a version newer than its data
+    version = users_version.get(db)
+    cached = user_cache.get(user_id)
+    if cached is not None and cached[0] == version:
+        principal = cached[1]
+    else:
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if user is None:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+        user_cache.set(user_id, (version, principal))
 
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
@@ -0,0 +1,153 @@
+"""
+Load benchmark for the async database mode
+Starts the API with uvicorn in threadpool (sync) mode and in DATABASE_ASYNC
+mode on the same throwaway SQLite database, and drives each with a burst of
+kanban drags (PUT stage changes) while other clients read the request list.
+Reports requests per second, p50/p99 latency of the reads and the drags, and
+failed requests (5xx responses and dropped connections). In sync mode each
+drag keeps its connection while its response waits for a thread, so with more
+concurrent clients than pooled connections plus threads (30 + 40 by default)
+requests stall until the pool timeout and fail.
+
+    python benchmarks/async_mode.py [--seconds 10] [--writers 40] [--readers 10]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+DB_DIR = tempfile.mkdtemp(prefix="gearguard-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+
+import httpx
+from sqlalchemy import insert
+import init_data
+import models
+from database import SessionLocal, engine
+
+REQUESTS = 2000
+
+
+def seed(db):
+    """Equipment and requests in the first two (open) stages"""
+    now = datetime.now()
+    db.execute(insert(models.Equipment), [
+        {"name": f"Machine {i}", "serial_no": f"SN-{i:06d}", "maintenance_team_id": i % 2 + 1} for i in range(200)
+    ])
+    db.execute(insert(models.MaintenanceRequest), [
+        {
+            "name": f"Request {i}", "priority": str(i % 4), "equipment_id": i % 200 + 1,
+            "maintenance_team_id": i % 2 + 1, "stage_id": i % 2 + 1, "schedule_date": now + timedelta(days=i % 60),
+        }
+        for i in range(REQUESTS)
+    ])
+    db.commit()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, database_async: bool) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_ASYNC=str(database_async).lower())
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start within 30 seconds")
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else float("nan")
+
+
+async def load(base: str, seconds: float, writers: int, readers: int):
+    """(requests per second, read latencies, drag latencies, failures) under the mixed load"""
+    reads, writes, failures = [], [], [0]
+    limits = httpx.Limits(max_connections=writers + readers)
+    async with httpx.AsyncClient(base_url=base, timeout=60, limits=limits) as client:
+        deadline = time.perf_counter() + seconds
+
+        async def timed(latencies, method, url, **kwargs):
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                failures[0] += 1
+                return
+            if response.status_code >= 500:
+                failures[0] += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+        async def drag(request_id: int):
+            stage_id = 1
+            while time.perf_counter() < deadline:
+                stage_id = 3 - stage_id
+                await timed(writes, "PUT", f"/api/requests/{request_id}", json={"stage_id": stage_id})
+
+        async def read():
+            while time.perf_counter() < deadline:
+                await timed(reads, "GET", "/api/requests", params={"limit": 20})
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(drag(request_id) for request_id in range(1, writers + 1)),
+            *(read() for _ in range(readers)),
+        )
+        elapsed = time.perf_counter() - started
+    return (len(reads) + len(writes)) / elapsed, reads, writes, failures[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--writers", type=int, default=40)
+    parser.add_argument("--readers", type=int, default=10)
+    args = parser.parse_args()
+
+    init_data.init_database()
+    with SessionLocal() as db:
+        seed(db)
+    engine.dispose()
+
+    print(f"{'mode':<8}{'req/s':>8}{'read p50 ms':>13}{'read p99 ms':>13}{'drag p50 ms':>13}{'drag p99 ms':>13}{'failed':>8}")
+    for mode, database_async in (("sync", False), ("async", True)):
+        port = free_port()
+        server = start_server(port, database_async)
+        try:
+            rate, reads, writes, failures = asyncio.run(load(f"http://127.0.0.1:{port}", args.seconds, args.writers, args.readers))
+        finally:
+            server.terminate()
+            server.wait()
+        print(
+            f"{mode:<8}{rate:>8.0f}{percentile(reads, 0.5) * 1e3:>13.1f}{percentile(reads, 0.99) * 1e3:>13.1f}"
+            f"{percentile(writes, 0.5) * 1e3:>13.1f}{percentile(writes, 0.99) * 1e3:>13.1f}{failures:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
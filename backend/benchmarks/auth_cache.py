@@ -0,0 +1,84 @@
+"""
+Benchmark for the authentication caches
+Times an authenticated endpoint (GET /api/auth/me) and the get_current_user
+dependency on its own, with the principal and token caches and with caches
+that never hit (every call verifies the JWT signature and loads the user, as
+before), on a throwaway SQLite database.
+
+    python benchmarks/auth_cache.py [--rounds 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_DIR = tempfile.mkdtemp(prefix="gearguard-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+import auth
+import init_data
+import models
+from database import SessionLocal, engine
+from main import app
+from ttl_cache import TTLCache
+
+
+def measure(call, rounds: int):
+    """(statements per call, mean microseconds per call)"""
+    call()
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            call()
+        elapsed = time.perf_counter() - start
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return statements[0] / rounds, elapsed / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    init_data.init_database()
+    client = TestClient(app)
+    db = SessionLocal()
+    try:
+        user_id = db.query(models.User.id).filter(models.User.email == "admin@gearguard.com").scalar()
+        token = auth.create_access_token(data={"sub": str(user_id)})
+        headers = {"Authorization": f"Bearer {token}"}
+        calls = {
+            "GET /api/auth/me": lambda: client.get("/api/auth/me", headers=headers),
+            "get_current_user()": lambda: auth.get_current_user(token, db),
+        }
+        caches = (auth.user_cache, auth.token_cache)
+        print(f"{'call':<20}{'stmts before':>13}{'stmts after':>12}{'µs before':>11}{'µs after':>10}{'req/s before':>14}{'req/s after':>13}")
+        for name, call in calls.items():
+            auth.user_cache, auth.token_cache = TTLCache(maxsize=0, ttl=0), TTLCache(maxsize=0, ttl=0)
+            before = measure(call, args.rounds)
+            auth.user_cache, auth.token_cache = caches
+            after = measure(call, args.rounds)
+            print(
+                f"{name:<20}{before[0]:>13.2f}{after[0]:>12.2f}{before[1]:>11.1f}{after[1]:>10.1f}"
+                f"{1e6 / before[1]:>14.0f}{1e6 / after[1]:>13.0f}"
+            )
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
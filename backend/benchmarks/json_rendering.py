@@ -0,0 +1,131 @@
+"""
+Micro-benchmark for list endpoint rendering
+Times one 100-row page of the largest list endpoints through FastAPI's
+response_model path (stdlib json and orjson) and through the TypeAdapter
+fast path, on a throwaway SQLite database.
+
+    python benchmarks/json_rendering.py [--rounds 200]
+"""
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_DIR = tempfile.mkdtemp(prefix="gearguard-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from typing import List
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload, selectinload
+from database import SessionLocal, engine
+import fast_json
+import models
+import schemas
+from settings import settings
+
+PAGE = 100
+DESCRIPTION = "<p>Check the <strong>spindle</strong> bearings, replace worn seals and log vibration readings.</p>" * 8
+
+
+def seed(db):
+    """Users, teams, equipment and requests sized like a busy site"""
+    now = datetime.now()
+    db.execute(insert(models.User), [
+        {"name": f"Technician {i}", "email": f"tech{i}@example.com", "password_hash": "x"} for i in range(500)
+    ])
+    db.execute(insert(models.Category), [{"name": f"Category {i}"} for i in range(20)])
+    db.execute(insert(models.Team), [{"name": f"Team {i}", "leader_id": i + 1} for i in range(50)])
+    db.execute(models.team_members.insert(), [
+        {"team_id": i % 50 + 1, "user_id": i + 1} for i in range(500)
+    ])
+    db.execute(insert(models.Equipment), [
+        {
+            "name": f"Machine {i}", "serial_no": f"SN-{i:06d}", "model": "X200", "category_id": i % 20 + 1,
+            "department": "Production", "location": f"Hall {i % 7}", "maintenance_team_id": i % 50 + 1,
+            "technician_id": i % 500 + 1, "purchase_value": 1250.5, "note": DESCRIPTION,
+        }
+        for i in range(2000)
+    ])
+    db.execute(insert(models.MaintenanceRequest), [
+        {
+            "name": f"Request {i}", "priority": str(i % 4), "equipment_id": i % 2000 + 1,
+            "maintenance_team_id": i % 50 + 1, "technician_id": i % 500 + 1, "stage_id": 1,
+            "schedule_date": now + timedelta(days=i % 60), "duration": 2.5, "description": DESCRIPTION,
+        }
+        for i in range(5000)
+    ])
+    db.commit()
+
+
+def pages(db):
+    """One page per endpoint, loaded the way the endpoints load them"""
+    return {
+        "/api/requests": (schemas.MaintenanceRequest, db.query(models.MaintenanceRequest).limit(PAGE).all()),
+        "/api/equipment": (schemas.Equipment, db.query(models.Equipment).limit(PAGE).all()),
+        "/api/teams": (schemas.Team, db.query(models.Team).options(
+            joinedload(models.Team.leader), selectinload(models.Team.members)
+        ).limit(PAGE).all()),
+        "/api/users": (schemas.UserResponse, db.query(models.User).limit(PAGE).all()),
+    }
+
+
+def run_inline(coroutine):
+    """Result of a coroutine that never suspends, without event loop overhead"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def timed(render, rounds: int) -> float:
+    """Mean microseconds per call"""
+    render()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        render()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed(db)
+        settings.fast_json = True
+        print(f"{'endpoint':<16}{'json µs':>10}{'orjson µs':>11}{'fast µs':>10}{'speedup':>9}{'bytes':>9}{'gzip':>8}")
+        for path, (schema, rows) in pages(db).items():
+            field = create_response_field(name=path, type_=List[schema])
+
+            def via_response_model(response_class):
+                content = run_inline(serialize_response(field=field, response_content=rows, is_coroutine=True))
+                return response_class(content).body
+
+            baseline = timed(lambda: via_response_model(JSONResponse), args.rounds)
+            orjson = timed(lambda: via_response_model(ORJSONResponse), args.rounds)
+            fast = timed(lambda: fast_json.render_list(schema, rows).body, args.rounds)
+            body = fast_json.render_list(schema, rows).body
+            print(
+                f"{path:<16}{baseline:>10.0f}{orjson:>11.0f}{fast:>10.0f}{baseline / fast:>8.1f}x"
+                f"{len(body):>9}{len(gzip.compress(body, 6)):>8}"
+            )
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Load test for password hashing during a login storm
+Starts the API with uvicorn on a throwaway SQLite database, once hashing
+inline (PASSWORD_HASH_WORKERS=0, as before the process pool) and once with
+the pool, and keeps clients reading the kanban board while a burst of logins
+arrives. Reports kanban p50/p99 latency before and during the storm and how
+the logins ended (200, 503 backpressure, other).
+
+    python benchmarks/login_storm.py [--logins 60] [--readers 4] [--async]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+DB_DIR = tempfile.mkdtemp(prefix="gearguard-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+
+import httpx
+import auth
+import init_data
+from database import engine
+from settings import settings
+
+CREDENTIALS = {"email": "admin@gearguard.com", "password": "admin123"}
+IDLE_SECONDS = 3
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, env: dict) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=dict(os.environ, **env), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start within 30 seconds")
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else float("nan")
+
+
+async def storm(base: str, logins: int, readers: int):
+    """(kanban latencies before the storm, during it, login status counts, storm seconds)"""
+    idle, busy = [], []
+    async with httpx.AsyncClient(base_url=base, timeout=120) as client:
+        storming = asyncio.Event()
+        done = asyncio.Event()
+
+        async def read():
+            while not done.is_set():
+                start = time.perf_counter()
+                response = await client.get("/api/kanban")
+                response.raise_for_status()
+                (busy if storming.is_set() else idle).append(time.perf_counter() - start)
+
+        async def login():
+            try:
+                return (await client.post("/api/auth/login", json=CREDENTIALS)).status_code
+            except httpx.TransportError:
+                return "error"
+
+        reading = [asyncio.create_task(read()) for _ in range(readers)]
+        await asyncio.sleep(IDLE_SECONDS)
+        storming.set()
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*reading)
+    counts = {status: statuses.count(status) for status in set(statuses)}
+    return idle, busy, counts, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=60)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--async", dest="database_async", action="store_true", help="serve in DATABASE_ASYNC mode")
+    args = parser.parse_args()
+
+    init_data.init_database()
+    auth.shutdown_hash_pool()
+    engine.dispose()
+
+    print(
+        f"{'hashing':<10}{'idle p50 ms':>12}{'idle p99 ms':>12}{'storm p50 ms':>13}{'storm p99 ms':>13}"
+        f"{'storm s':>9}  logins"
+    )
+    workers = max(settings.password_hash_workers, 1)
+    for name, hash_workers in (("inline", 0), (f"pool x{workers}", workers)):
+        port = free_port()
+        server = start_server(port, {
+            "DATABASE_ASYNC": str(args.database_async).lower(),
+            "PASSWORD_HASH_WORKERS": str(hash_workers),
+        })
+        try:
+            idle, busy, counts, elapsed = asyncio.run(storm(f"http://127.0.0.1:{port}", args.logins, args.readers))
+        finally:
+            server.terminate()
+            server.wait()
+        outcome = ", ".join(f"{status}: {count}" for status, count in sorted(counts.items(), key=str))
+        print(
+            f"{name:<10}{percentile(idle, 0.5) * 1e3:>12.1f}{percentile(idle, 0.99) * 1e3:>12.1f}"
+            f"{percentile(busy, 0.5) * 1e3:>13.1f}{percentile(busy, 0.99) * 1e3:>13.1f}{elapsed:>9.1f}  {outcome}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Micro-benchmark for the cost of metrics collection
+Times a minimal ASGI request with and without MetricsMiddleware, a trivial
+SQL statement on an engine with and without the statement timers, and a pool
+checkout/checkin with and without the wait timer. The differences are the
+overhead added per request, statement and checkout.
+
+    python benchmarks/metrics_overhead.py [--rounds 100000]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+import metrics
+
+START = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+BODY = {"type": "http.response.body", "body": b"{}"}
+
+
+class Route:
+    path = "/api/requests/{request_id}"
+
+
+ROUTE = Route()
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = ROUTE
+    await send(START)
+    await send(BODY)
+
+
+async def receive():
+    return {"type": "http.request"}
+
+
+async def send(message):
+    pass
+
+
+def run_inline(coroutine):
+    """Result of a coroutine that never suspends, without event loop overhead"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def timed(call, rounds: int, repeats: int = 5) -> float:
+    """Mean microseconds per call, best of `repeats` runs"""
+    call()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            call()
+        best = min(best, time.perf_counter() - start)
+    return best / rounds * 1e6
+
+
+def request(app):
+    scope = {"type": "http", "method": "GET", "path": "/api/requests/1"}
+    return lambda: run_inline(app(scope, receive, send))
+
+
+def statement(instrumented: bool):
+    engine = create_engine("sqlite://")
+    if instrumented:
+        metrics.instrument_engine(engine)
+    connection = engine.connect()
+    select_one = text("SELECT 1")
+    return lambda: connection.execute(select_one)
+
+
+def checkout(pool_class):
+    engine = create_engine("sqlite://", poolclass=pool_class, pool_size=1)
+    pool = engine.pool
+
+    def call():
+        pool.connect().close()
+    return call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=100000)
+    args = parser.parse_args()
+
+    cases = {
+        "request": (request(endpoint), request(metrics.MetricsMiddleware(endpoint))),
+        "SQL statement": (statement(False), statement(True)),
+        "pool checkout": (checkout(QueuePool), checkout(metrics.timed_pool(QueuePool))),
+    }
+    print(f"{'':<16}{'plain µs':>10}{'metrics µs':>12}{'overhead µs':>13}")
+    for name, (plain, instrumented) in cases.items():
+        base = timed(plain, args.rounds)
+        measured = timed(instrumented, args.rounds)
+        print(f"{name:<16}{base:>10.2f}{measured:>12.2f}{measured - base:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
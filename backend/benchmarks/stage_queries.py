@@ -0,0 +1,114 @@
+"""
+Benchmark for the in-process stage registry
+Runs the endpoints that read stages with the registry and with a registry that
+queries the stages table on every call (as the endpoints did before it), on a
+throwaway SQLite database. Reports SQL statements and time per request.
+
+    python benchmarks/stage_queries.py [--rounds 300]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_DIR = tempfile.mkdtemp(prefix="gearguard-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+import init_data
+import models
+import stage_cache
+from database import SessionLocal, engine
+from main import app
+
+
+class UncachedRegistry(stage_cache.StageRegistry):
+    """Loads the stages on every call, like the endpoints before the registry"""
+
+    def get(self, db):
+        return self._load(db, 0)
+
+
+def seed(db):
+    """Equipment with requests spread over every stage"""
+    now = datetime.now()
+    stage_ids = [stage_id for (stage_id,) in db.query(models.Stage.id)]
+    db.execute(insert(models.Equipment), [
+        {"name": f"Machine {i}", "serial_no": f"SN-{i:06d}", "maintenance_team_id": i % 2 + 1} for i in range(200)
+    ])
+    db.execute(insert(models.MaintenanceRequest), [
+        {
+            "name": f"Request {i}", "priority": str(i % 4), "equipment_id": i % 200 + 1,
+            "maintenance_team_id": i % 2 + 1, "stage_id": stage_ids[i % len(stage_ids)],
+            "schedule_date": now + timedelta(days=i % 60),
+        }
+        for i in range(2000)
+    ])
+    db.commit()
+
+
+def requests(client, db):
+    """name -> call issuing one request to an endpoint that reads stages"""
+    open_stages = [stage_id for (stage_id,) in db.query(models.Stage.id).filter(models.Stage.done == False)][:2]
+    request_id = db.query(models.MaintenanceRequest.id).filter(models.MaintenanceRequest.stage_id.in_(open_stages)).first()[0]
+    moves = iter(open_stages * 10**6)
+    return {
+        "GET /api/stages": lambda: client.get("/api/stages"),
+        "GET /api/kanban": lambda: client.get("/api/kanban"),
+        "GET equipment count": lambda: client.get("/api/equipment/1/requests/count"),
+        "GET analytics": lambda: client.get("/api/analytics/summary"),
+        "PUT stage change": lambda: client.put(f"/api/requests/{request_id}", json={"stage_id": next(moves)}),
+    }
+
+
+def measure(call, rounds: int):
+    """(statements per call, mean microseconds per call)"""
+    call()
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            call()
+        elapsed = time.perf_counter() - start
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return statements[0] / rounds, elapsed / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=300)
+    args = parser.parse_args()
+
+    init_data.init_database()
+    client = TestClient(app)
+    db = SessionLocal()
+    try:
+        seed(db)
+        calls = requests(client, db)
+        cached = stage_cache.registry
+        print(f"{'endpoint':<20}{'stmts before':>13}{'stmts after':>12}{'µs before':>11}{'µs after':>10}")
+        for name, call in calls.items():
+            stage_cache.registry = UncachedRegistry()
+            before = measure(call, args.rounds)
+            stage_cache.registry = cached
+            after = measure(call, args.rounds)
+            print(f"{name:<20}{before[0]:>13.2f}{after[0]:>12.2f}{before[1]:>11.0f}{after[1]:>10.0f}")
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
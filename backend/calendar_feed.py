@@ -0,0 +1,98 @@
+"""
+iCalendar (RFC 5545) rendering for scheduled maintenance requests
+Events are rendered one at a time so feeds can be streamed.
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator
+
+PRODID = "-//GearGuard//Maintenance Calendar//EN"
+DEFAULT_DURATION_HOURS = 1.0
+
+
+def escape_text(value: str) -> str:
+    """Escape a TEXT property value"""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line: str) -> str:
+    """Fold a content line to 75 octets, terminated by CRLF"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte UTF-8 sequence
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def format_datetime(value: datetime) -> str:
+    """Floating (local) DATE-TIME, as schedule dates are stored"""
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def format_utc(value: datetime) -> str:
+    """UTC DATE-TIME of a naive datetime.utcnow() value"""
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def event_end(event) -> datetime:
+    """When a scheduled request ends (requests without a duration last an hour)"""
+    return event.schedule_date + timedelta(hours=event.duration or DEFAULT_DURATION_HOURS)
+
+
+def render_event(event, stamp: str) -> str:
+    """
+    VEVENT for a row with id, name, schedule_date, duration, equipment_name,
+    technician_name; `stamp` is the formatted DTSTAMP shared by the feed
+    """
+    start = event.schedule_date
+    end = event_end(event)
+    details = [f"Equipment: {event.equipment_name}"] if event.equipment_name else []
+    if event.technician_name:
+        details.append(f"Technician: {event.technician_name}")
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:maintenance-request-{event.id}@gearguard",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{format_datetime(start)}",
+        f"DTEND:{format_datetime(end)}",
+        f"SUMMARY:{escape_text(event.name)}",
+    ]
+    if details:
+        description = escape_text("\n".join(details))
+        lines.append(f"DESCRIPTION:{description}")
+    lines.append("END:VEVENT")
+    return "".join(fold_line(line) for line in lines)
+
+
+def iter_calendar(events: Iterable, name: str, events_per_chunk: int = 200) -> Iterator[str]:
+    """Yield a VCALENDAR document in chunks of at most `events_per_chunk` events"""
+    stamp = format_utc(datetime.utcnow())
+    chunk = [fold_line(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    )]
+    for count, event in enumerate(events, 1):
+        chunk.append(render_event(event, stamp))
+        if count % events_per_chunk == 0:
+            yield "".join(chunk)
+            chunk = []
+    chunk.append(fold_line("END:VCALENDAR"))
+    yield "".join(chunk)
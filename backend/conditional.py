@@ -0,0 +1,63 @@
+"""
+Conditional GET (ETag / If-None-Match) for read endpoints
+The validator is built from the per-table change counters in versions, so a
+matching request is answered 304 before any rows are loaded or serialised.
+"""
+from datetime import date
+from typing import Dict, Optional, Sequence
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+import versions
+from database import get_db
+
+# Browsers keep the body but revalidate on every use
+CACHE_CONTROL = "private, no-cache"
+# Random per database, so validators never survive a database reset
+EPOCH_NAME = "epoch"
+# Pseudo-table for responses computed relative to the current date
+TODAY = "today"
+
+
+def compute_etag(db: Session, tables) -> str:
+    """Weak ETag from the database epoch and the versions of `tables`"""
+    names = (EPOCH_NAME, *tables)
+    values = versions.get_many(db, [name for name in names if name != TODAY])
+    if EPOCH_NAME not in values:
+        values[EPOCH_NAME] = versions.ensure_random(db, EPOCH_NAME)
+    if TODAY in names:
+        values[TODAY] = date.today().toordinal()
+    return 'W/"' + "-".join(str(values.get(name, 0)) for name in names) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for this header)"""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def etag(*tables: str, includes: Optional[Dict[str, Sequence[str]]] = None):
+    """
+    Route dependency: send an ETag for `tables` and answer 304 when the client's
+    copy is current. `includes` maps values of the `include` query parameter to
+    the further tables they read.
+    """
+    def check(request: Request, response: Response, db: Session = Depends(get_db)):
+        names = list(tables)
+        for value in request.query_params.get("include", "").split(","):
+            names.extend((includes or {}).get(value.strip(), ()))
+        headers = {"ETag": compute_etag(db, names), "Cache-Control": CACHE_CONTROL}
+        # Return the connection to the pool: the endpoint runs in another threadpool
+        # call, and requests holding connections while they queue for a thread can
+        # starve the threads waiting for a connection
+        db.rollback()
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return Depends(check)
@@ -0,0 +1,121 @@
+"""
+Incrementally maintained dashboard counters
+Write handlers apply deltas in their own transaction so /api/dashboard/stats
+is a single small read; `python counters.py` rebuilds them from scratch.
+Handlers that change existing rows compute the deltas from rows they have
+locked (database.begin_write), so concurrent edits of a row cannot both count
+the same old value.
+"""
+from typing import Dict, Iterable, Optional
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+import models
+import stage_cache
+
+COUNTER_NAMES = (
+    "total_equipment",
+    "active_equipment",
+    "scrapped_equipment",
+    "total_requests",
+    "open_requests",
+    "completed_requests",
+    "urgent_requests",
+    "overdue_requests",  # maintained by overdue.py
+)
+
+
+def done_stage_ids(db: Session) -> frozenset:
+    """Ids of stages that close a request"""
+    return stage_cache.get(db).done_ids
+
+
+def equipment_contribution(equipment: Optional[models.Equipment]) -> Dict[str, int]:
+    """What a single equipment row adds to the counters"""
+    if equipment is None:
+        return {}
+    return {
+        "total_equipment": 1,
+        "active_equipment": int(bool(equipment.active)),
+        "scrapped_equipment": int(bool(equipment.is_scrap)),
+    }
+
+
+def request_contribution(request: Optional[models.MaintenanceRequest], done_ids: Iterable[int]) -> Dict[str, int]:
+    """What a single maintenance request adds to the counters"""
+    if request is None:
+        return {}
+    # Without a stage a request is open, as in analytics (coalesce(done, false))
+    is_done = request.stage_id is not None and request.stage_id in done_ids
+    return {
+        "total_requests": 1,
+        "open_requests": int(not is_done),
+        "completed_requests": int(is_done),
+        "urgent_requests": int(request.priority == "3"),
+    }
+
+
+def diff(before: Dict[str, int], after: Dict[str, int]) -> Dict[str, int]:
+    """Counter deltas between two contributions"""
+    return {name: after.get(name, 0) - before.get(name, 0) for name in set(before) | set(after)}
+
+
+def apply(db: Session, deltas: Dict[str, int]):
+    """Add deltas to the counters inside the caller's transaction"""
+    for name, delta in deltas.items():
+        if delta:
+            db.execute(
+                update(models.Counter)
+                .where(models.Counter.name == name)
+                .values(value=models.Counter.value + delta)
+            )
+
+
+def compute(db: Session) -> Dict[str, int]:
+    """Count everything from scratch"""
+    # Read stages directly: a rebuild may run before the stage cache sees the change
+    done_ids = [stage_id for (stage_id,) in db.query(models.Stage.id).filter(models.Stage.done == True)]
+    request = models.MaintenanceRequest
+    return {
+        "total_equipment": db.query(models.Equipment).count(),
+        "active_equipment": db.query(models.Equipment).filter(models.Equipment.active == True).count(),
+        "scrapped_equipment": db.query(models.Equipment).filter(models.Equipment.is_scrap == True).count(),
+        "total_requests": db.query(request).count(),
+        "open_requests": db.query(request).filter(
+            or_(request.stage_id.is_(None), request.stage_id.notin_(done_ids))
+        ).count(),
+        "completed_requests": db.query(request).filter(request.stage_id.in_(done_ids)).count(),
+        "urgent_requests": db.query(request).filter(request.priority == "3").count(),
+        "overdue_requests": db.query(request).filter(request.is_overdue == True).count(),
+    }
+
+
+def rebuild(db: Session) -> Dict[str, int]:
+    """Replace the stored counters with freshly computed values (caller commits)"""
+    db.flush()
+    values = compute(db)
+    db.query(models.Counter).delete()
+    db.add_all(models.Counter(name=name, value=value) for name, value in values.items())
+    return values
+
+
+def read(db: Session) -> Dict[str, int]:
+    """Current counter values, rebuilding them once if they were never initialised"""
+    values = dict(db.query(models.Counter.name, models.Counter.value).all())
+    if any(name not in values for name in COUNTER_NAMES):
+        values = rebuild(db)
+        db.commit()
+    return values
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        values = rebuild(db)
+        db.commit()
+        for name, value in values.items():
+            print(f"✅ {name}: {value}")
+    finally:
+        db.close()
@@ -0,0 +1,77 @@
+"""
+Streaming CSV / NDJSON exports
+Rows are read with yield_per and encoded into chunks of roughly CHUNK_BYTES,
+optionally gzip-compressed on the fly, so memory stays flat for any result size.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Iterable, Iterator, Sequence
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+CHUNK_BYTES = 64 * 1024
+YIELD_PER = 1000
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{value.__class__.__name__} is not JSON serializable")
+
+
+def iter_csv(columns: Sequence[str], rows: Iterable[Sequence]) -> Iterator[str]:
+    """Header plus one CSV line per row, yielded in ~CHUNK_BYTES pieces"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(columns: Sequence[str], rows: Iterable[Sequence]) -> Iterator[str]:
+    """One JSON object per line, yielded in ~CHUNK_BYTES pieces"""
+    lines, size = [], 0
+    for row in rows:
+        line = json.dumps(dict(zip(columns, row)), default=_json_default, separators=(",", ":")) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(lines)
+            lines, size = [], 0
+    yield "".join(lines)
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def iter_export(columns: Sequence[str], rows: Iterable[Sequence], fmt: str, compress: bool = False) -> Iterator[bytes]:
+    """Encoded export body for `rows` in `fmt`"""
+    encode = iter_csv if fmt == "csv" else iter_ndjson
+    chunks = (text.encode("utf-8") for text in encode(columns, rows) if text)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def response_headers(name: str, fmt: str, compress: bool):
+    """(media type, headers) for an export download"""
+    media_type, extension = FORMATS[fmt]
+    filename = f"{name}.{extension}"
+    if compress:
+        media_type, filename = "application/gzip", f"{filename}.gz"
+    return media_type, {"Content-Disposition": f'attachment; filename="{filename}"'}
@@ -1,20 +1,117 @@
 """Database configuration and session management"""
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+import metrics
+from settings import settings
 
-# SQLite database - simple and no installation needed!
-SQLALCHEMY_DATABASE_URL = "sqlite:///./gearguard.db"
+# SQLite by default - simple and no installation needed! Set DATABASE_URL for PostgreSQL.
+SQLALCHEMY_DATABASE_URL = settings.database_url
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
-)
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """Connection and pool arguments for the configured backend"""
+    pool_class = AsyncAdaptedQueuePool if is_async else QueuePool
+    options = {
+        "poolclass": metrics.timed_pool(pool_class) if settings.metrics_enabled else pool_class,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+    if is_sqlite(url):
+        # Needed for SQLite; the driver-level timeout mirrors busy_timeout
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": settings.sqlite_busy_timeout_ms / 1000,
+        }
+    else:
+        options["pool_recycle"] = settings.db_pool_recycle
+        options["pool_pre_ping"] = True
+    return options
+
+
+def sqlite_pragmas() -> dict:
+    """Production profile: WAL so readers never block on the writer, plus cache and I/O tuning"""
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "cache_size": -settings.sqlite_cache_size_kib,  # negative means KiB
+        "mmap_size": settings.sqlite_mmap_size,
+        "temp_store": settings.sqlite_temp_store,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+    }
+
+
+def install_sqlite_pragmas(sync_engine):
+    """Run the tuning pragmas on every new SQLite connection"""
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+if is_sqlite(SQLALCHEMY_DATABASE_URL):
+    install_sqlite_pragmas(engine)
+if settings.metrics_enabled:
+    metrics.instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Optional async engine (DATABASE_ASYNC=true): aiosqlite for SQLite, asyncpg for PostgreSQL
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+async_engine = None
+AsyncSessionLocal = None
+
+
+def async_database_url(url: str) -> str:
+    """Swap a sync database URL's driver for its asyncio equivalent"""
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+", 1)[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return f"{ASYNC_DRIVERS[backend]}://{rest}"
+
+
+if settings.database_async:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        async_database_url(SQLALCHEMY_DATABASE_URL), **engine_options(SQLALCHEMY_DATABASE_URL, is_async=True)
+    )
+    if is_sqlite(SQLALCHEMY_DATABASE_URL):
+        install_sqlite_pragmas(async_engine.sync_engine)
+    if settings.metrics_enabled:
+        metrics.instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
+
+def begin_write(db):
+    """
+    Start the session's transaction as the database writer (SQLite's BEGIN
+    IMMEDIATE), so the rows a handler reads to compute counter deltas cannot
+    change before it commits. Other databases lock those rows instead, by
+    loading them with SELECT ... FOR UPDATE (with_for_update(), which SQLite ignores).
+    """
+    connection = db.connection()
+    if connection.dialect.name != "sqlite":
+        return
+    # The driver opens transactions only for writes, so earlier reads leave none open
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
 
 def get_db():
     """Dependency to get database session"""
@@ -24,3 +121,8 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    """Dependency to get an async database session (async mode only)"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,188 @@
+"""
+Bulk equipment import from CSV or NDJSON streams
+Rows are parsed as the upload arrives, names are resolved through lookup maps
+built once, and valid rows are inserted with executemany in chunked transactions.
+"""
+import csv
+import io
+import json
+from datetime import date
+from typing import Callable, Dict, Iterator, List, Optional
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+import counters
+import models
+import preventive
+import schemas
+
+FORMATS = ("csv", "ndjson")
+MAX_REPORTED_ERRORS = 1000
+
+# Columns that may be given by name instead of id
+NAME_COLUMNS = {
+    "category": "category_id",
+    "maintenance_team": "maintenance_team_id",
+    "technician": "technician_id",
+    "owner": "owner_id",
+}
+
+
+class ChunkReader(io.RawIOBase):
+    """File-like view over a callable returning the next bytes chunk (None at the end)"""
+
+    def __init__(self, next_chunk: Callable[[], Optional[bytes]]):
+        self._next_chunk = next_chunk
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        while not self._buffer:
+            chunk = self._next_chunk()
+            if chunk is None:
+                return 0
+            self._buffer = chunk
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def iter_records(stream: io.TextIOBase, fmt: str) -> Iterator[dict]:
+    """Yield raw records; a record that cannot be parsed is yielded as a ValueError"""
+    if fmt == "csv":
+        for record in csv.DictReader(stream):
+            yield record
+        return
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Invalid JSON: {e}")
+            continue
+        yield record if isinstance(record, dict) else ValueError("Expected a JSON object")
+
+
+class Lookups:
+    """Name -> id maps for categories, teams and users, loaded once per import"""
+
+    def __init__(self, db: Session):
+        self.maps = {
+            "category": {name.strip().lower(): id for id, name in db.query(models.Category.id, models.Category.name)},
+            "maintenance_team": {name.strip().lower(): id for id, name in db.query(models.Team.id, models.Team.name)},
+        }
+        users = {}
+        for id, name, email in db.query(models.User.id, models.User.name, models.User.email):
+            users[name.strip().lower()] = id
+            users[email.strip().lower()] = id
+        self.maps["technician"] = users
+        self.maps["owner"] = users
+        self.serials = {serial for (serial,) in db.query(models.Equipment.serial_no).filter(
+            models.Equipment.serial_no.isnot(None)
+        )}
+
+    def resolve(self, column: str, name: str) -> int:
+        id = self.maps[column].get(name.strip().lower())
+        if id is None:
+            raise ValueError(f"Unknown {column.replace('_', ' ')} '{name}'")
+        return id
+
+
+def prepare_row(record: dict, lookups: Lookups) -> dict:
+    """Validate one record and return the column values to insert"""
+    values = {key.strip(): (value if value != "" else None) for key, value in record.items() if key}
+    for column, id_column in NAME_COLUMNS.items():
+        name = values.pop(column, None)
+        if name is not None and values.get(id_column) is None:
+            values[id_column] = lookups.resolve(column, str(name))
+    try:
+        row = schemas.EquipmentCreate(**values).model_dump()
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        ))
+    error = preventive.check_rule(row)
+    if error:
+        raise ValueError(error)
+    row["next_preventive_date"] = preventive.first_date(row, date.today())
+    serial = row.get("serial_no")
+    if serial is not None:
+        if serial in lookups.serials:
+            raise ValueError(f"Duplicate serial number '{serial}'")
+        lookups.serials.add(serial)
+    return row
+
+
+def describe_error(error: SQLAlchemyError) -> str:
+    """Short reason for a failed insert (the driver's message when there is one)"""
+    reason = getattr(error, "orig", None)
+    return f"{error.__class__.__name__}: {reason}" if reason is not None else error.__class__.__name__
+
+
+def insert_batch(db: Session, rows: List[dict]):
+    """Insert one batch and its counter deltas in a single transaction"""
+    db.execute(insert(models.Equipment), rows)
+    counters.apply(db, {
+        "total_equipment": len(rows),
+        "active_equipment": sum(1 for row in rows if row["active"]),
+        "scrapped_equipment": sum(1 for row in rows if row["is_scrap"]),
+    })
+    db.commit()
+
+
+def import_equipment(db: Session, next_chunk: Callable[[], Optional[bytes]], fmt: str, batch_size: int = 1000) -> Dict:
+    """Import every record from the stream and return a per-row error report"""
+    stream = io.TextIOWrapper(io.BufferedReader(ChunkReader(next_chunk)), encoding="utf-8-sig", errors="replace", newline="")
+    lookups = Lookups(db)
+    report = {"total_rows": 0, "inserted": 0, "failed": 0, "errors": []}
+
+    def fail(row_number: int, error: str):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row_number, "error": error})
+
+    batch, batch_rows = [], []
+
+    def insert_row(row: dict, row_number: int):
+        try:
+            insert_batch(db, [row])
+            report["inserted"] += 1
+        except SQLAlchemyError as e:
+            db.rollback()
+            # Not inserted, so a later row may still use the serial number
+            lookups.serials.discard(row.get("serial_no"))
+            fail(row_number, f"Insert failed: {describe_error(e)}")
+
+    def flush():
+        try:
+            insert_batch(db, batch)
+            report["inserted"] += len(batch)
+        except SQLAlchemyError:
+            db.rollback()
+            # Retry one row per transaction, so only the offending rows fail
+            for row, row_number in zip(batch, batch_rows):
+                insert_row(row, row_number)
+        batch.clear()
+        batch_rows.clear()
+
+    for row_number, record in enumerate(iter_records(stream, fmt), 1):
+        report["total_rows"] = row_number
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            batch.append(prepare_row(record, lookups))
+            batch_rows.append(row_number)
+        except ValueError as e:
+            fail(row_number, str(e))
+            continue
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return report
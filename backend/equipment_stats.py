@@ -0,0 +1,62 @@
+"""
+Per-equipment maintenance statistics
+Same meaning as the Odoo computed fields maintenance_count,
+maintenance_open_count and next_maintenance_date, computed for a whole page
+of equipment in one grouped query instead of several queries per record.
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Sequence
+from sqlalchemy import and_, case, func, or_, true
+from sqlalchemy.orm import Session
+import models
+import stage_cache
+
+# Equipment ids per query, well below SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+Request = models.MaintenanceRequest
+
+
+def _chunks(ids: List[int]) -> Iterable[List[int]]:
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def empty() -> Dict:
+    return {"maintenance_count": 0, "maintenance_open_count": 0, "next_maintenance_date": None}
+
+
+def load(db: Session, equipment_ids: Sequence[int]) -> Dict[int, Dict]:
+    """Statistics of active requests per equipment id (every id gets an entry)"""
+    ids = sorted(set(equipment_ids))
+    stats = {equipment_id: empty() for equipment_id in ids}
+    done_ids = list(stage_cache.get(db).done_ids)
+    # Requests without a stage are open, as in counters and the dashboard
+    is_open = or_(Request.stage_id.is_(None), Request.stage_id.notin_(done_ids)) if done_ids else true()
+    today = datetime.combine(date.today(), datetime.min.time())
+
+    for chunk in _chunks(ids):
+        rows = db.query(
+            Request.equipment_id,
+            func.count(Request.id),
+            func.count(case((is_open, 1))),
+            func.min(case((and_(is_open, Request.schedule_date >= today), Request.schedule_date))),
+        ).filter(
+            Request.equipment_id.in_(chunk),
+            Request.active == True
+        ).group_by(Request.equipment_id)
+        for equipment_id, count, open_count, next_date in rows:
+            stats[equipment_id] = {
+                "maintenance_count": count,
+                "maintenance_open_count": open_count,
+                "next_maintenance_date": next_date.date() if next_date else None,
+            }
+    return stats
+
+
+def attach(db: Session, equipment: Sequence[models.Equipment]):
+    """Set the statistics as attributes on each loaded equipment"""
+    stats = load(db, [item.id for item in equipment])
+    for item in equipment:
+        for name, value in stats[item.id].items():
+            setattr(item, name, value)
@@ -0,0 +1,269 @@
+"""
+Live change events for the kanban, dashboard and analytics views
+Handlers publish compact events (id, changed fields, current stage) inside
+their transaction and subscribers receive them once it commits. The "local"
+backend fans out within this worker; the "sqlite" backend goes through the
+change_events table, which every worker polls, so it works with several workers.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional
+import anyio
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+import models
+from database import SessionLocal
+from settings import settings
+
+REQUEST_FIELDS = (
+    "name",
+    "active",
+    "request_type",
+    "priority",
+    "equipment_id",
+    "maintenance_team_id",
+    "technician_id",
+    "schedule_date",
+    "close_date",
+    "is_overdue",
+    "duration",
+    "stage_id",
+)
+PENDING_KEY = "pending_change_events"
+# SQLite backend: polls between deletions of events older than the retention period
+PRUNE_EVERY = 1000
+
+
+def _jsonable(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def make_event(type: str, id: int, changes: Dict, stage_id: Optional[int] = None, team_ids: Iterable = ()) -> Dict:
+    """Event payload; subscribers filtered by team receive it if any of `team_ids` matches"""
+    return {
+        "type": type,
+        "id": id,
+        "stage_id": stage_id,
+        "team_ids": sorted({team_id for team_id in team_ids if team_id is not None}),
+        "changes": {name: _jsonable(value) for name, value in changes.items()},
+    }
+
+
+def request_state(request: models.MaintenanceRequest) -> Dict:
+    """Fields of a request that events report changes for"""
+    return {name: getattr(request, name) for name in REQUEST_FIELDS}
+
+
+def request_event(kind: str, request: models.MaintenanceRequest, before: Optional[Dict] = None) -> Optional[Dict]:
+    """request.<kind> event with the fields that differ from `before` (all fields if None)"""
+    after = request_state(request)
+    changes = after if before is None else {
+        name: value for name, value in after.items() if before.get(name) != value
+    }
+    if not changes:
+        return None
+    previous_team = before.get("maintenance_team_id") if before else None
+    return make_event(
+        f"request.{kind}", request.id, changes,
+        stage_id=request.stage_id, team_ids=(request.maintenance_team_id, previous_team),
+    )
+
+
+def equipment_scrapped_event(equipment: models.Equipment) -> Dict:
+    return make_event(
+        "equipment.scrapped", equipment.id,
+        {"is_scrap": equipment.is_scrap, "active": equipment.active, "scrap_date": equipment.scrap_date},
+        team_ids=(equipment.maintenance_team_id,),
+    )
+
+
+def format_message(event_id: int, payload: Dict) -> str:
+    """Server-Sent Events message"""
+    data = json.dumps(payload, separators=(",", ":"))
+    return f"id: {event_id}\ndata: {data}\n\n"
+
+
+RESYNC_MESSAGE = "event: resync\ndata: {}\n\n"
+
+
+class Subscription:
+    """One connected client; messages arrive on its event loop"""
+
+    def __init__(self, hub: "Hub", team_id: Optional[int], maxsize: int):
+        self.hub = hub
+        self.team_id = team_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def wants(self, payload: Dict) -> bool:
+        return self.team_id is None or self.team_id in payload["team_ids"]
+
+    def push(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client fell behind: drop its backlog and tell it to refetch
+            self.overflowed = True
+
+    async def next(self, timeout: float) -> Optional[str]:
+        """Next message, or None if nothing arrived within `timeout` seconds"""
+        if self.overflowed:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.overflowed = False
+            return RESYNC_MESSAGE
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.hub.remove(self)
+
+
+class Hub:
+    """Subscriptions of this worker"""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def add(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.add(subscription)
+
+    def remove(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def deliver(self, event_id: int, payload: Dict):
+        """Queue an event for every interested subscription (callable from any thread)"""
+        with self._lock:
+            subscriptions = [subscription for subscription in self._subscriptions if subscription.wants(payload)]
+        if not subscriptions:
+            return
+        message = format_message(event_id, payload)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, message)
+            except RuntimeError:  # event loop closed
+                self.remove(subscription)
+
+
+class LocalBackend:
+    """Delivers committed events to this worker's subscribers only"""
+
+    def __init__(self, hub: Hub):
+        self.hub = hub
+        self._ids = itertools.count(1)
+
+    def stage(self, db: Session, payload: Dict):
+        db.info.setdefault(PENDING_KEY, []).append(payload)
+
+    def committed(self, payloads):
+        for payload in payloads:
+            self.hub.deliver(next(self._ids), payload)
+
+    def start(self):
+        pass
+
+
+class SQLiteBackend:
+    """Writes events to change_events in the caller's transaction; each worker polls the table"""
+
+    def __init__(self, hub: Hub, poll_interval: float, retention: float):
+        self.hub = hub
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._task: Optional[asyncio.Task] = None
+
+    def stage(self, db: Session, payload: Dict):
+        db.add(models.ChangeEvent(payload=json.dumps(payload, separators=(",", ":")), created_at=datetime.utcnow()))
+
+    def committed(self, payloads):
+        pass
+
+    def start(self):
+        """Run the poller on the current event loop while there are subscribers"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    def _latest_id(self) -> int:
+        with SessionLocal() as db:
+            return db.query(models.ChangeEvent.id).order_by(models.ChangeEvent.id.desc()).limit(1).scalar() or 0
+
+    def _fetch(self, after_id: int):
+        with SessionLocal() as db:
+            return db.query(models.ChangeEvent.id, models.ChangeEvent.payload).filter(
+                models.ChangeEvent.id > after_id
+            ).order_by(models.ChangeEvent.id).limit(1000).all()
+
+    def _prune(self):
+        with SessionLocal() as db:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+            # Keep the newest event, so tables created without AUTOINCREMENT never reuse ids
+            latest_id = db.query(func.max(models.ChangeEvent.id)).scalar() or 0
+            db.query(models.ChangeEvent).filter(
+                models.ChangeEvent.created_at < cutoff, models.ChangeEvent.id < latest_id
+            ).delete()
+            db.commit()
+
+    async def _poll(self):
+        last_id = await anyio.to_thread.run_sync(self._latest_id)
+        await anyio.to_thread.run_sync(self._prune)
+        for polls in itertools.count(1):
+            if not len(self.hub):
+                break
+            await asyncio.sleep(self.poll_interval)
+            if polls % PRUNE_EVERY == 0:
+                await anyio.to_thread.run_sync(self._prune)
+            for event_id, payload in await anyio.to_thread.run_sync(self._fetch, last_id):
+                last_id = event_id
+                self.hub.deliver(event_id, json.loads(payload))
+
+
+def _create_backend(name: str):
+    if name == "local":
+        return LocalBackend(hub)
+    if name == "sqlite":
+        return SQLiteBackend(hub, settings.events_poll_interval, settings.events_retention)
+    raise ValueError(f"Unknown EVENTS_BACKEND '{name}'")
+
+
+hub = Hub()
+backend = _create_backend(settings.events_backend)
+
+
+def publish(db: Session, payload: Optional[Dict]):
+    """Publish an event when the caller's transaction commits"""
+    if payload is not None:
+        backend.stage(db, payload)
+
+
+def subscribe(team_id: Optional[int] = None) -> Subscription:
+    """New subscription on the running event loop (close() it when the client goes away)"""
+    subscription = Subscription(hub, team_id, settings.events_queue_size)
+    hub.add(subscription)
+    backend.start()
+    return subscription
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_committed(session: Session):
+    payloads = session.info.pop(PENDING_KEY, None)
+    if payloads:
+        backend.committed(payloads)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    session.info.pop(PENDING_KEY, None)
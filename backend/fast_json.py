@@ -0,0 +1,33 @@
+"""
+Fast JSON rendering for list endpoints
+With FAST_JSON=true a list is validated and encoded in one pass through a
+cached TypeAdapter instead of response_model validation followed by a
+separate JSON encode. Otherwise full rows are returned for FastAPI to
+serialise; sparse fieldsets always take the TypeAdapter path.
+"""
+from typing import Any, Optional, Sequence, Tuple
+from fastapi import Response
+import fieldsets
+from settings import settings
+
+
+def render_list(
+    schema: Any,
+    rows: Sequence,
+    response: Response = None,
+    fields: Optional[Tuple[str, ...]] = None,
+    always: bool = False,
+):
+    """
+    JSON Response for `rows` as a list of `schema` (restricted to `fields`), keeping
+    headers set on `response`. `always` encodes here even when FastAPI could, e.g.
+    when `schema` has fields the route's response_model lacks.
+    """
+    all_fields = tuple(schema.model_fields)
+    fields = fields or all_fields
+    if not settings.fast_json and fields == all_fields and not always:
+        return rows
+    adapter = fieldsets.list_adapter(schema, fields)
+    body = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    headers = dict(response.headers) if response is not None else None
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,51 @@
+"""
+Sparse fieldsets for list endpoints
+`fields=id,name,stage_id` limits both the columns loaded (load_only) and the
+serialised output. Without `fields`, heavy Text columns are left out of list
+responses; `fields=*` returns every field.
+"""
+from functools import lru_cache
+from typing import Any, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from pydantic import ConfigDict, TypeAdapter, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+ALL_FIELDS = "*"
+
+
+def parse_fields(fields: Optional[str], schema: Any, heavy: Sequence[str] = ()) -> Tuple[str, ...]:
+    """Selected schema fields in declaration order; `id` is always included"""
+    available = list(schema.model_fields)
+    if fields is None:
+        return tuple(name for name in available if name not in heavy)
+    if fields.strip() == ALL_FIELDS:
+        return tuple(available)
+
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(available)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return tuple(name for name in available if name in requested)
+
+
+def load_columns(model: Any, fields: Sequence[str], *required):
+    """load_only option for the selected fields plus `required` columns (e.g. the sort key)"""
+    column_keys = set(inspect(model).column_attrs.keys())
+    columns = [getattr(model, name) for name in fields if name in column_keys]
+    return load_only(*columns, *required)
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema: Any, fields: Tuple[str, ...]) -> TypeAdapter:
+    """TypeAdapter for a list of `schema` restricted to `fields`"""
+    if fields == tuple(schema.model_fields):
+        item = schema
+    else:
+        item = create_model(
+            f"{schema.__name__}Fields",
+            __config__=ConfigDict(from_attributes=True),
+            **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields},
+        )
+    return TypeAdapter(list[item])
@@ -0,0 +1,236 @@
+"""
+Durable background jobs
+Handlers enqueue side-effect work (recounts, schedule generation, ...) into
+the jobs table inside their own transaction and respond; worker threads in
+every API process claim due jobs by priority, run them, retry failures with
+exponential backoff and move jobs that keep failing to the dead-letter list
+(status "dead"). A claimed job holds a lease, so the work of a process that
+died mid-job is picked up again once the lease runs out.
+"""
+import itertools
+import json
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import and_, event, func, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+import models
+from database import SessionLocal
+from settings import settings
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+STATUSES = (QUEUED, RUNNING, DONE, DEAD)
+
+# Priorities: higher runs first
+LOW, NORMAL, HIGH = -10, 0, 10
+MAX_ATTEMPTS = 5
+# Delay before the first retry, doubled for each further one
+RETRY_DELAY = timedelta(seconds=5)
+MAX_ERROR_LENGTH = 4000
+ENQUEUED_KEY = "jobs_enqueued"
+# Polls between deletions of finished jobs older than the retention period
+PRUNE_EVERY = 1000
+
+Job = models.Job
+Handler = Callable[..., Optional[Dict]]
+handlers: Dict[str, Handler] = {}
+
+
+def handler(kind: str):
+    """Register the function that runs jobs of `kind`: fn(db, **payload), returning a JSON-able result"""
+    def register(fn: Handler) -> Handler:
+        handlers[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Optional[Dict] = None,
+    priority: int = NORMAL,
+    unique: bool = False,
+    max_attempts: int = MAX_ATTEMPTS,
+) -> Job:
+    """
+    Add a job to the caller's transaction; it becomes visible to workers when
+    that commits. With `unique`, a job of the same kind and payload that is
+    still waiting to run is returned instead of adding another.
+    """
+    if kind not in handlers:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    payload_json = json.dumps(payload or {}, sort_keys=True, separators=(",", ":"))
+    if unique:
+        db.flush()
+        waiting = db.query(Job).filter(Job.kind == kind, Job.payload == payload_json, Job.status == QUEUED).first()
+        if waiting is not None:
+            return waiting
+    now = datetime.utcnow()
+    job = Job(
+        kind=kind, payload=payload_json, priority=priority, status=QUEUED,
+        attempts=0, max_attempts=max_attempts, run_after=now, created_at=now,
+    )
+    db.add(job)
+    db.info[ENQUEUED_KEY] = True
+    return job
+
+
+def retry(db: Session, job: Job):
+    """Put a dead job back in the queue with a fresh set of attempts"""
+    job.status = QUEUED
+    job.attempts = 0
+    job.run_after = datetime.utcnow()
+    job.finished_at = None
+    db.info[ENQUEUED_KEY] = True
+
+
+def status_counts(db: Session) -> Dict[str, Dict[str, int]]:
+    """Number of jobs per kind and status"""
+    counts: Dict[str, Dict[str, int]] = {}
+    for kind, status, count in db.query(Job.kind, Job.status, func.count(Job.id)).group_by(Job.kind, Job.status):
+        counts.setdefault(kind, dict.fromkeys(STATUSES, 0))[status] = count
+    return counts
+
+
+def _error_text(error: BaseException) -> str:
+    text = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+    return text[-MAX_ERROR_LENGTH:]
+
+
+def claim(db: Session, now: datetime) -> Optional[Row]:
+    """
+    Take the next due job: queued and due, or running with an expired lease.
+    Idle polls only read; the claiming UPDATE re-checks the candidate, so two
+    workers never claim the same job.
+    """
+    due = and_(Job.status.in_((QUEUED, RUNNING)), Job.run_after <= now)
+    while True:
+        candidate = db.execute(
+            select(Job.id, Job.status, Job.attempts).where(due)
+            .order_by(Job.priority.desc(), Job.id).limit(1).with_for_update(skip_locked=True)
+        ).first()
+        if candidate is None:
+            db.rollback()
+            return None
+        row = db.execute(
+            update(Job).where(
+                Job.id == candidate.id, Job.status == candidate.status, Job.attempts == candidate.attempts, due
+            ).values(
+                status=RUNNING,
+                attempts=Job.attempts + 1,
+                run_after=now + timedelta(seconds=settings.jobs_lease),
+                started_at=now,
+            ).returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+        ).first()
+        db.commit()
+        if row is not None:
+            return row
+        # Another worker claimed it first: look for the next one
+
+
+def _finish(job, values: Dict):
+    """Record the outcome, unless the lease expired and another worker took the job over"""
+    with SessionLocal() as db:
+        db.execute(update(Job).where(Job.id == job.id, Job.attempts == job.attempts).values(**values))
+        db.commit()
+
+
+def run(job) -> bool:
+    """Run a claimed job in its own session; returns whether it succeeded"""
+    now = datetime.utcnow()
+    try:
+        with SessionLocal() as db:
+            result = handlers[job.kind](db, **json.loads(job.payload))
+            db.commit()
+    except Exception as e:
+        if job.attempts >= job.max_attempts or job.kind not in handlers:
+            values = {"status": DEAD, "finished_at": now}
+        else:
+            values = {"status": QUEUED, "run_after": now + RETRY_DELAY * 2 ** (job.attempts - 1)}
+        _finish(job, {**values, "last_error": _error_text(e)})
+        print(f"✗ Job {job.id} ({job.kind}) failed, attempt {job.attempts}/{job.max_attempts}: {e}")
+        return False
+    _finish(job, {
+        "status": DONE,
+        "finished_at": datetime.utcnow(),
+        "result": json.dumps(result, default=str) if result is not None else None,
+    })
+    return True
+
+
+def prune(db: Session):
+    """Delete finished jobs older than the retention period (dead jobs stay until retried)"""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.jobs_retention)
+    db.query(Job).filter(Job.status == DONE, Job.finished_at < cutoff).delete()
+    db.commit()
+
+
+class Workers:
+    """Threads that claim and run jobs, woken on local commits and polling for the rest"""
+
+    def __init__(self, count: int, poll_interval: float):
+        self.count = count
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        if self.count <= 0 or self._threads:
+            return
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._run, args=(number,), name=f"jobs-{number}", daemon=True)
+            for number in range(self.count)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _run(self, number: int):
+        for polls in itertools.count():
+            if self._stopping.is_set():
+                break
+            try:
+                if number == 0 and polls % PRUNE_EVERY == 0:
+                    with SessionLocal() as db:
+                        prune(db)
+                with SessionLocal() as db:
+                    job = claim(db, datetime.utcnow())
+            except Exception as e:
+                print(f"✗ Claiming a job failed: {e}")
+                job = None
+            if job is not None:
+                run(job)
+                continue
+            # Nothing due: sleep until a local enqueue or the next poll
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+workers = Workers(settings.jobs_workers, settings.jobs_poll_interval)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_workers(session: Session):
+    if session.info.pop(ENQUEUED_KEY, False):
+        workers.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_enqueued(session: Session):
+    session.info.pop(ENQUEUED_KEY, None)
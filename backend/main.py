@@ -2,16 +2,40 @@
 GearGuard Standalone API
 FastAPI backend for maintenance management
 """
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import timedelta
+from sqlalchemy import String, case, cast, exists, func, literal, null, select, union_all
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import List, Optional
+from datetime import date, datetime, time, timedelta
+import anyio
+import secrets
 import models
 import schemas
 import auth
-from database import engine, get_db
+import counters
+import events
+import jobs
+import metrics
+import overdue
+import preventive
+import conditional
+import equipment_import
+import equipment_stats
+import data_export
+import request_bulk
+import search
+import calendar_feed
+import fast_json
+import fieldsets
+import stage_cache
+from compression import CompressionMiddleware
+from pagination import NEXT_CURSOR_HEADER, keyset_page, paginate
+from database import SessionLocal, begin_write, engine, get_db
+from settings import settings
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
@@ -19,9 +43,32 @@ models.Base.metadata.create_all(bind=engine)
 app = FastAPI(
     title="GearGuard API",
     description="Maintenance Management System API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse if settings.fast_json else JSONResponse
 )
 
+if settings.database_async:
+    from async_routes import AsyncSessionRoute
+
+    app.router.route_class = AsyncSessionRoute
+
+
+@app.on_event("startup")
+def start_workers():
+    """Start background workers"""
+    auth.size_hash_thread_slots(anyio.to_thread.current_default_thread_limiter().total_tokens)
+    overdue.sweeper.start()
+    jobs.workers.start()
+
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    """Stop background worker processes"""
+    overdue.sweeper.stop()
+    jobs.workers.stop()
+    auth.shutdown_hash_pool()
+
+
 # CORS middleware to allow Next.js frontend
 app.add_middleware(
     CORSMiddleware,
@@ -33,9 +80,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"]
+    # A wildcard is not honoured on credentialed requests
+    expose_headers=[NEXT_CURSOR_HEADER]
 )
 
+if settings.compression_minimum_size > 0:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.gzip_level,
+        brotli_quality=settings.brotli_quality,
+    )
+
+# Outermost, so latency includes compression and every other middleware
+if settings.metrics_enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 
 @app.get("/")
 def read_root():
@@ -47,6 +107,19 @@ def read_root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics(request: Request):
+    """Prometheus metrics"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not settings.metrics_token:
+        if not settings.metrics_public:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Metrics token not configured")
+    elif not secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {settings.metrics_token}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(metrics.render(engine), media_type=metrics.CONTENT_TYPE)
+
+
 # ============================================================================
 # AUTHENTICATION ENDPOINTS
 # ============================================================================
@@ -75,7 +148,7 @@ def register(user_data: schemas.UserRegister, db: Session = Depends(get_db)):
     db.refresh(new_user)
 
     # Create access token
-    access_token = auth.create_access_token(data={"sub": new_user.id})
+    access_token = auth.create_access_token(data={"sub": str(new_user.id)})
 
     return {
         "access_token": access_token,
@@ -96,7 +169,7 @@ def login(user_data: schemas.UserLogin, db: Session = Depends(get_db)):
         )
 
     # Create access token
-    access_token = auth.create_access_token(data={"sub": user.id})
+    access_token = auth.create_access_token(data={"sub": str(user.id)})
 
     return {
         "access_token": access_token,
@@ -106,20 +179,119 @@ def login(user_data: schemas.UserLogin, db: Session = Depends(get_db)):
 
 
 @app.get("/api/auth/me", response_model=schemas.UserResponse)
-def get_current_user_info(current_user: models.User = Depends(auth.get_current_user)):
+def get_current_user_info(current_user: auth.Principal = Depends(auth.get_current_user)):
     """Get current authenticated user info"""
     return current_user
 
 
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+@jobs.handler("recount")
+def recount(db: Session):
+    """Re-derive overdue flags and dashboard counters after the set of done stages changed"""
+    overdue.sync(db)
+    counters.rebuild(db)
+
+
+@jobs.handler("preventive.generate")
+def generate_preventive_requests(db: Session, horizon_days: int):
+    return preventive.generate(db, date.today() + timedelta(days=horizon_days))
+
+
+# ============================================================================
+# ADMIN ENDPOINTS
+# ============================================================================
+
+@app.post("/api/admin/preventive/generate", response_model=schemas.Job, status_code=status.HTTP_202_ACCEPTED)
+def generate_preventive(
+    horizon_days: Optional[int] = None,
+    current_user: auth.Principal = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Queue generation of the preventive requests due within `horizon_days` (default PREVENTIVE_HORIZON_DAYS)"""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can generate preventive schedules"
+        )
+    days = horizon_days if horizon_days is not None else settings.preventive_horizon_days
+    job = jobs.enqueue(db, "preventive.generate", {"horizon_days": days}, unique=True)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+@app.get("/api/admin/jobs", response_model=schemas.JobQueueStatus)
+def get_jobs(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    kind: Optional[str] = None,
+    limit: int = 50,
+    current_user: auth.Principal = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Job counts per kind and status, and the latest jobs (`status=dead` lists the dead letters)"""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view background jobs"
+        )
+    if status_filter is not None and status_filter not in jobs.STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of: {', '.join(jobs.STATUSES)}")
+
+    query = db.query(models.Job)
+    if status_filter is not None:
+        query = query.filter(models.Job.status == status_filter)
+    if kind is not None:
+        query = query.filter(models.Job.kind == kind)
+    latest = query.order_by(models.Job.id.desc()).limit(max(1, min(limit, 500))).all()
+    return {"counts": jobs.status_counts(db), "jobs": latest}
+
+
+@app.post("/api/admin/jobs/{job_id}/retry", response_model=schemas.Job)
+def retry_job(
+    job_id: int,
+    current_user: auth.Principal = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Put a dead job back in the queue"""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can retry background jobs"
+        )
+    job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != jobs.DEAD:
+        raise HTTPException(status_code=409, detail="Only dead jobs can be retried")
+    jobs.retry(db, job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+@app.get("/api/admin/cache")
+def get_cache_stats(current_user: auth.Principal = Depends(auth.get_current_user)):
+    """Hit/miss counters for the in-process authentication caches"""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view cache statistics"
+        )
+    return auth.cache_stats()
+
+
 # ============================================================================
 # CATEGORY ENDPOINTS
 # ============================================================================
 
-@app.get("/api/categories", response_model=List[schemas.Category])
-def get_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@app.get("/api/categories", response_model=List[schemas.Category], dependencies=[conditional.etag("categories")])
+def get_categories(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """Get all equipment categories"""
-    categories = db.query(models.Category).offset(skip).limit(limit).all()
-    return categories
+    categories = paginate(db.query(models.Category), [(models.Category.id, False)], response, limit, skip, cursor)
+    return fast_json.render_list(schemas.Category, categories, response)
 
 
 @app.post("/api/categories", response_model=schemas.Category, status_code=status.HTTP_201_CREATED)
@@ -132,7 +304,7 @@ def create_category(category: schemas.CategoryCreate, db: Session = Depends(get_
     return db_category
 
 
-@app.get("/api/categories/{category_id}", response_model=schemas.Category)
+@app.get("/api/categories/{category_id}", response_model=schemas.Category, dependencies=[conditional.etag("categories")])
 def get_category(category_id: int, db: Session = Depends(get_db)):
     """Get a specific category"""
     category = db.query(models.Category).filter(models.Category.id == category_id).first()
@@ -172,15 +344,15 @@ def delete_category(category_id: int, db: Session = Depends(get_db)):
 # USER ENDPOINTS
 # ============================================================================
 
-@app.get("/api/users", response_model=List[schemas.UserResponse])
-def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@app.get("/api/users", response_model=List[schemas.UserResponse], dependencies=[conditional.etag("users")])
+def get_users(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """Get all users"""
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+    users = paginate(db.query(models.User), [(models.User.id, False)], response, limit, skip, cursor)
+    return fast_json.render_list(schemas.UserResponse, users, response)
 
 
 @app.post("/api/users", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(user_data: schemas.UserRegister, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+def create_user(user_data: schemas.UserRegister, db: Session = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
     """Create a new user (admin only)"""
     # Check if current user is admin
     if not current_user.is_admin:
@@ -225,11 +397,16 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 # TEAM ENDPOINTS
 # ============================================================================
 
-@app.get("/api/teams", response_model=List[schemas.Team])
-def get_teams(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+# schemas.Team serialises leader and members: load them up front instead of per team
+TEAM_LOAD_OPTIONS = (joinedload(models.Team.leader), selectinload(models.Team.members))
+
+
+@app.get("/api/teams", response_model=List[schemas.Team], dependencies=[conditional.etag("teams", "users")])
+def get_teams(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """Get all maintenance teams"""
-    teams = db.query(models.Team).filter(models.Team.active == True).offset(skip).limit(limit).all()
-    return teams
+    query = db.query(models.Team).options(*TEAM_LOAD_OPTIONS).filter(models.Team.active == True)
+    teams = paginate(query, [(models.Team.id, False)], response, limit, skip, cursor)
+    return fast_json.render_list(schemas.Team, teams, response)
 
 
 @app.post("/api/teams", response_model=schemas.Team, status_code=status.HTTP_201_CREATED)
@@ -251,10 +428,10 @@ def create_team(team: schemas.TeamCreate, db: Session = Depends(get_db)):
     return db_team
 
 
-@app.get("/api/teams/{team_id}", response_model=schemas.Team)
+@app.get("/api/teams/{team_id}", response_model=schemas.Team, dependencies=[conditional.etag("teams", "users")])
 def get_team(team_id: int, db: Session = Depends(get_db)):
     """Get a specific team"""
-    team = db.query(models.Team).filter(models.Team.id == team_id).first()
+    team = db.query(models.Team).options(*TEAM_LOAD_OPTIONS).filter(models.Team.id == team_id).first()
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
     return team
@@ -291,27 +468,129 @@ def delete_team(team_id: int, db: Session = Depends(get_db)):
 # EQUIPMENT ENDPOINTS
 # ============================================================================
 
-@app.get("/api/equipment", response_model=List[schemas.Equipment])
-def get_equipment(skip: int = 0, limit: int = 100, active_only: bool = True, db: Session = Depends(get_db)):
-    """Get all equipment"""
-    query = db.query(models.Equipment)
+# Unbounded Text columns left out of list responses unless requested with `fields`
+EQUIPMENT_HEAVY_FIELDS = ("note",)
+
+
+# `include` values accepted by the equipment list, and the tables each one reads
+EQUIPMENT_INCLUDES = {"stats": ("maintenance_requests", "stages", conditional.TODAY)}
+
+
+@app.get(
+    "/api/equipment",
+    response_model=List[schemas.Equipment],
+    dependencies=[conditional.etag("equipment", includes=EQUIPMENT_INCLUDES)],
+)
+def get_equipment(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    active_only: bool = True,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get all equipment (`fields` selects the returned fields; `note` only when asked for).
+    `include=stats` adds maintenance_count, maintenance_open_count and
+    next_maintenance_date, computed for the whole page in one query.
+    """
+    includes = {name.strip() for name in include.split(",") if name.strip()} if include else set()
+    unknown = includes - set(EQUIPMENT_INCLUDES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+    schema = schemas.EquipmentWithStats if "stats" in includes else schemas.Equipment
+
+    selected = fieldsets.parse_fields(fields, schema, heavy=EQUIPMENT_HEAVY_FIELDS)
+    query = db.query(models.Equipment).options(fieldsets.load_columns(models.Equipment, selected))
     if active_only:
         query = query.filter(models.Equipment.active == True)
-    equipment = query.offset(skip).limit(limit).all()
-    return equipment
+    equipment = paginate(query, [(models.Equipment.id, False)], response, limit, skip, cursor)
+    if "stats" in includes:
+        equipment_stats.attach(db, equipment)
+        # Extends the response_model, so it is encoded here rather than filtered by FastAPI
+        return fast_json.render_list(schema, equipment, response, selected, always=True)
+    return fast_json.render_list(schema, equipment, response, selected)
+
+
+def _export_response(build_query, table, name: str, format: str, compress: bool):
+    """StreamingResponse exporting the rows of build_query(db) with the columns of `table`"""
+    if format not in data_export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}'")
+    columns = [column.name for column in table.columns]
+
+    def generate():
+        # The request-scoped session is closed before streaming starts, so the export owns its own
+        db = SessionLocal()
+        try:
+            rows = build_query(db).yield_per(data_export.YIELD_PER)
+            yield from data_export.iter_export(columns, rows, format, compress)
+        finally:
+            db.close()
+
+    media_type, headers = data_export.response_headers(name, format, compress)
+    return StreamingResponse(generate(), media_type=media_type, headers=headers)
+
+
+@app.get("/api/equipment/export")
+def export_equipment(format: str = "csv", compress: bool = False, active_only: bool = True):
+    """Stream all equipment as CSV or NDJSON (optionally gzipped)"""
+    def build_query(db: Session):
+        query = db.query(*models.Equipment.__table__.columns)
+        if active_only:
+            query = query.filter(models.Equipment.active == True)
+        return query.order_by(models.Equipment.id)
+
+    return _export_response(build_query, models.Equipment.__table__, "equipment", format, compress)
 
 
 @app.post("/api/equipment", response_model=schemas.Equipment, status_code=status.HTTP_201_CREATED)
 def create_equipment(equipment: schemas.EquipmentCreate, db: Session = Depends(get_db)):
     """Create new equipment"""
-    db_equipment = models.Equipment(**equipment.dict())
+    values = equipment.dict()
+    error = preventive.check_rule(values)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    values["next_preventive_date"] = preventive.first_date(values, date.today())
+    db_equipment = models.Equipment(**values)
     db.add(db_equipment)
+    counters.apply(db, counters.equipment_contribution(db_equipment))
     db.commit()
     db.refresh(db_equipment)
     return db_equipment
 
 
-@app.get("/api/equipment/{equipment_id}", response_model=schemas.Equipment)
+@app.post("/api/equipment/import", response_model=schemas.ImportReport)
+async def import_equipment(request: Request, format: Optional[str] = None, batch_size: int = 1000):
+    """
+    Bulk-create equipment from a streamed CSV or NDJSON body. Columns follow
+    the equipment fields; category, maintenance_team, technician and owner
+    may be given by name (or email for users) instead of id.
+    """
+    fmt = format or ("ndjson" if "json" in request.headers.get("content-type", "") else "csv")
+    if fmt not in equipment_import.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}'")
+    chunks = request.stream()
+
+    def next_chunk():
+        # Called from the import thread: pull the next body chunk from the event loop
+        try:
+            return anyio.from_thread.run(chunks.__anext__)
+        except StopAsyncIteration:
+            return None
+
+    def run_import():
+        db = SessionLocal()
+        try:
+            return equipment_import.import_equipment(db, next_chunk, fmt, max(batch_size, 1))
+        finally:
+            db.close()
+
+    return await run_in_threadpool(run_import)
+
+
+@app.get("/api/equipment/{equipment_id}", response_model=schemas.Equipment, dependencies=[conditional.etag("equipment")])
 def get_equipment_by_id(equipment_id: int, db: Session = Depends(get_db)):
     """Get specific equipment"""
     equipment = db.query(models.Equipment).filter(models.Equipment.id == equipment_id).first()
@@ -340,13 +619,29 @@ def get_equipment_details(equipment_id: int, db: Session = Depends(get_db)):
 @app.put("/api/equipment/{equipment_id}", response_model=schemas.Equipment)
 def update_equipment(equipment_id: int, equipment: schemas.EquipmentCreate, db: Session = Depends(get_db)):
     """Update equipment"""
-    db_equipment = db.query(models.Equipment).filter(models.Equipment.id == equipment_id).first()
+    # Lock the row: the counter deltas below are computed from its current values
+    begin_write(db)
+    db_equipment = db.query(models.Equipment).filter(models.Equipment.id == equipment_id).with_for_update().first()
     if not db_equipment:
         raise HTTPException(status_code=404, detail="Equipment not found")
 
+    before = counters.equipment_contribution(db_equipment)
+    rule_before = preventive.rule_of(db_equipment)
+    next_before = db_equipment.next_preventive_date
     for key, value in equipment.dict(exclude_unset=True).items():
         setattr(db_equipment, key, value)
 
+    # A changed recurrence rule restarts from today unless a new next date is given
+    rule = preventive.rule_of(db_equipment)
+    if rule != rule_before:
+        error = preventive.check_rule(rule)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        given = db_equipment.next_preventive_date
+        rule["next_preventive_date"] = given if given != next_before else None
+        db_equipment.next_preventive_date = preventive.first_date(rule, date.today())
+    counters.apply(db, counters.diff(before, counters.equipment_contribution(db_equipment)))
+
     db.commit()
     db.refresh(db_equipment)
     return db_equipment
@@ -357,13 +652,17 @@ def scrap_equipment(equipment_id: int, db: Session = Depends(get_db)):
     """Mark equipment as scrapped"""
     from datetime import date
 
-    db_equipment = db.query(models.Equipment).filter(models.Equipment.id == equipment_id).first()
+    begin_write(db)
+    db_equipment = db.query(models.Equipment).filter(models.Equipment.id == equipment_id).with_for_update().first()
     if not db_equipment:
         raise HTTPException(status_code=404, detail="Equipment not found")
 
+    before = counters.equipment_contribution(db_equipment)
     db_equipment.is_scrap = True
     db_equipment.scrap_date = date.today()
     db_equipment.active = False
+    counters.apply(db, counters.diff(before, counters.equipment_contribution(db_equipment)))
+    events.publish(db, events.equipment_scrapped_event(db_equipment))
 
     db.commit()
     db.refresh(db_equipment)
@@ -371,49 +670,41 @@ def scrap_equipment(equipment_id: int, db: Session = Depends(get_db)):
 
 
 @app.get("/api/equipment/{equipment_id}/requests", response_model=List[schemas.MaintenanceRequest])
-def get_equipment_requests(equipment_id: int, db: Session = Depends(get_db)):
-    """Get all maintenance requests for a specific equipment"""
-    equipment = db.query(models.Equipment).filter(models.Equipment.id == equipment_id).first()
+def get_equipment_requests(equipment_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get all maintenance requests for a specific equipment (`fields` selects the returned fields)"""
+    equipment = db.query(models.Equipment.id).filter(models.Equipment.id == equipment_id).first()
     if not equipment:
         raise HTTPException(status_code=404, detail="Equipment not found")
 
-    requests = db.query(models.MaintenanceRequest).filter(
+    selected = fieldsets.parse_fields(fields, schemas.MaintenanceRequest)
+    requests = db.query(models.MaintenanceRequest).options(
+        fieldsets.load_columns(models.MaintenanceRequest, selected, models.MaintenanceRequest.created_at)
+    ).filter(
         models.MaintenanceRequest.equipment_id == equipment_id
     ).order_by(models.MaintenanceRequest.created_at.desc()).all()
 
-    return requests
+    return fast_json.render_list(schemas.MaintenanceRequest, requests, fields=selected)
 
 
 @app.get("/api/equipment/{equipment_id}/requests/count")
 def get_equipment_requests_count(equipment_id: int, db: Session = Depends(get_db)):
     """Get count of open maintenance requests for a specific equipment"""
-    equipment = db.query(models.Equipment).filter(models.Equipment.id == equipment_id).first()
-    if not equipment:
+    exists_query = db.query(models.Equipment.id).filter(models.Equipment.id == equipment_id)
+    if not db.query(exists_query.exists()).scalar():
         raise HTTPException(status_code=404, detail="Equipment not found")
 
-    # Get done stages
-    done_stages = db.query(models.Stage.id).filter(models.Stage.done == True).all()
-    done_stage_ids = [stage[0] for stage in done_stages]
-
-    # Count open requests (not in done stages)
-    open_count = db.query(models.MaintenanceRequest).filter(
-        models.MaintenanceRequest.equipment_id == equipment_id,
-        models.MaintenanceRequest.active == True,
-        ~models.MaintenanceRequest.stage_id.in_(done_stage_ids) if done_stage_ids else True
-    ).count()
-
-    return {"count": open_count}
+    stats = equipment_stats.load(db, [equipment_id])[equipment_id]
+    return {"count": stats["maintenance_open_count"]}
 
 
 # ============================================================================
 # STAGE ENDPOINTS
 # ============================================================================
 
-@app.get("/api/stages", response_model=List[schemas.Stage])
+@app.get("/api/stages", response_model=List[schemas.Stage], dependencies=[conditional.etag("stages")])
 def get_stages(db: Session = Depends(get_db)):
     """Get all stages"""
-    stages = db.query(models.Stage).order_by(models.Stage.sequence).all()
-    return stages
+    return stage_cache.get(db).stages
 
 
 @app.post("/api/stages", response_model=schemas.Stage, status_code=status.HTTP_201_CREATED)
@@ -421,6 +712,7 @@ def create_stage(stage: schemas.StageCreate, db: Session = Depends(get_db)):
     """Create a new stage"""
     db_stage = models.Stage(**stage.dict())
     db.add(db_stage)
+    stage_cache.changed(db)
     db.commit()
     db.refresh(db_stage)
     return db_stage
@@ -433,9 +725,14 @@ def update_stage(stage_id: int, stage: schemas.StageCreate, db: Session = Depend
     if not db_stage:
         raise HTTPException(status_code=404, detail="Stage not found")
 
+    was_done = bool(db_stage.done)
     for key, value in stage.dict(exclude_unset=True).items():
         setattr(db_stage, key, value)
 
+    stage_cache.changed(db)
+    # Open/completed counts and overdue flags depend on which stages are done
+    if bool(db_stage.done) != was_done:
+        jobs.enqueue(db, "recount", priority=jobs.HIGH, unique=True)
     db.commit()
     db.refresh(db_stage)
     return db_stage
@@ -449,6 +746,8 @@ def delete_stage(stage_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Stage not found")
 
     db.delete(db_stage)
+    stage_cache.changed(db)
+    jobs.enqueue(db, "recount", priority=jobs.HIGH, unique=True)
     db.commit()
     return None
 
@@ -457,20 +756,14 @@ def delete_stage(stage_id: int, db: Session = Depends(get_db)):
 # MAINTENANCE REQUEST ENDPOINTS
 # ============================================================================
 
-@app.get("/api/requests", response_model=List[schemas.MaintenanceRequest])
-def get_requests(
-    skip: int = 0,
-    limit: int = 100,
-    active_only: bool = True,
-    equipment_id: int = None,
-    team_id: int = None,
-    stage_id: int = None,
-    request_type: str = None,
-    db: Session = Depends(get_db)
-):
-    """Get all maintenance requests with optional filters"""
-    query = db.query(models.MaintenanceRequest)
+# Left out of request lists unless requested with `fields`
+REQUEST_HEAVY_FIELDS = ("description",)
 
+
+def _filter_requests(
+    query, active_only: bool, equipment_id: int, team_id: int, stage_id: int, request_type: str, is_overdue: bool = None
+):
+    """Apply the request list filters shared by the list and export endpoints"""
     if active_only:
         query = query.filter(models.MaintenanceRequest.active == True)
     if equipment_id:
@@ -481,9 +774,55 @@ def get_requests(
         query = query.filter(models.MaintenanceRequest.stage_id == stage_id)
     if request_type:
         query = query.filter(models.MaintenanceRequest.request_type == request_type)
+    if is_overdue is not None:
+        query = query.filter(models.MaintenanceRequest.is_overdue == is_overdue)
+    return query
 
-    requests = query.order_by(models.MaintenanceRequest.priority.desc()).offset(skip).limit(limit).all()
-    return requests
+
+@app.get("/api/requests", response_model=List[schemas.MaintenanceRequest], dependencies=[conditional.etag("maintenance_requests")])
+def get_requests(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    active_only: bool = True,
+    equipment_id: int = None,
+    team_id: int = None,
+    stage_id: int = None,
+    request_type: str = None,
+    is_overdue: Optional[bool] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get all maintenance requests with optional filters (`fields` selects the returned fields; `description` only when asked for)"""
+    selected = fieldsets.parse_fields(fields, schemas.MaintenanceRequest, heavy=REQUEST_HEAVY_FIELDS)
+    query = db.query(models.MaintenanceRequest).options(
+        fieldsets.load_columns(models.MaintenanceRequest, selected, models.MaintenanceRequest.priority)
+    )
+    query = _filter_requests(query, active_only, equipment_id, team_id, stage_id, request_type, is_overdue)
+    order = [(models.MaintenanceRequest.priority, True), (models.MaintenanceRequest.id, False)]
+    requests = paginate(query, order, response, limit, skip, cursor)
+    return fast_json.render_list(schemas.MaintenanceRequest, requests, response, selected)
+
+
+@app.get("/api/requests/export")
+def export_requests(
+    format: str = "csv",
+    compress: bool = False,
+    active_only: bool = True,
+    equipment_id: int = None,
+    team_id: int = None,
+    stage_id: int = None,
+    request_type: str = None,
+    is_overdue: Optional[bool] = None
+):
+    """Stream every matching maintenance request as CSV or NDJSON (optionally gzipped)"""
+    def build_query(db: Session):
+        query = db.query(*models.MaintenanceRequest.__table__.columns)
+        query = _filter_requests(query, active_only, equipment_id, team_id, stage_id, request_type, is_overdue)
+        return query.order_by(models.MaintenanceRequest.id)
+
+    return _export_response(build_query, models.MaintenanceRequest.__table__, "maintenance_requests", format, compress)
 
 
 @app.post("/api/requests", response_model=schemas.MaintenanceRequest, status_code=status.HTTP_201_CREATED)
@@ -500,12 +839,15 @@ def create_request(request: schemas.MaintenanceRequestCreate, db: Session = Depe
 
     db_request = models.MaintenanceRequest(**request.dict())
     db.add(db_request)
+    counters.apply(db, counters.request_contribution(db_request, counters.done_stage_ids(db)))
+    db.flush()
+    events.publish(db, events.request_event("created", db_request))
     db.commit()
     db.refresh(db_request)
     return db_request
 
 
-@app.get("/api/requests/{request_id}", response_model=schemas.MaintenanceRequest)
+@app.get("/api/requests/{request_id}", response_model=schemas.MaintenanceRequest, dependencies=[conditional.etag("maintenance_requests")])
 def get_request(request_id: int, db: Session = Depends(get_db)):
     """Get a specific maintenance request"""
     request = db.query(models.MaintenanceRequest).filter(models.MaintenanceRequest.id == request_id).first()
@@ -514,25 +856,43 @@ def get_request(request_id: int, db: Session = Depends(get_db)):
     return request
 
 
+@app.patch("/api/requests/bulk", response_model=schemas.BulkUpdateResult)
+def bulk_update_requests(body: schemas.MaintenanceRequestBulkUpdate, db: Session = Depends(get_db)):
+    """Update many maintenance requests in one transaction (items, or filter plus patch)"""
+    return request_bulk.bulk_update(db, body)
+
+
 @app.put("/api/requests/{request_id}", response_model=schemas.MaintenanceRequest)
 def update_request(request_id: int, request: schemas.MaintenanceRequestUpdate, db: Session = Depends(get_db)):
     """Update a maintenance request"""
     from datetime import date, datetime
 
-    db_request = db.query(models.MaintenanceRequest).filter(models.MaintenanceRequest.id == request_id).first()
+    # Lock the row: the counter and overdue deltas are computed from its current values
+    begin_write(db)
+    db_request = db.query(models.MaintenanceRequest).filter(
+        models.MaintenanceRequest.id == request_id
+    ).with_for_update().first()
     if not db_request:
         raise HTTPException(status_code=404, detail="Request not found")
 
+    done_ids = counters.done_stage_ids(db)
+    before = counters.request_contribution(db_request, done_ids)
+    state_before = events.request_state(db_request)
+
     # Check if moving to a different stage
     if request.stage_id and request.stage_id != db_request.stage_id:
-        stage = db.query(models.Stage).filter(models.Stage.id == request.stage_id).first()
+        stage = stage_cache.get(db).by_id.get(request.stage_id)
         if stage:
             # If moving to scrap stage, mark equipment as scrapped
             if stage.is_scrap:
                 equipment = db_request.equipment
+                db.refresh(equipment, with_for_update=True)
+                equipment_before = counters.equipment_contribution(equipment)
                 equipment.is_scrap = True
                 equipment.scrap_date = date.today()
                 equipment.active = False
+                counters.apply(db, counters.diff(equipment_before, counters.equipment_contribution(equipment)))
+                events.publish(db, events.equipment_scrapped_event(equipment))
 
             # If moving to done stage, set close_date
             if stage.done and not db_request.close_date:
@@ -540,6 +900,9 @@ def update_request(request_id: int, request: schemas.MaintenanceRequestUpdate, d
 
     for key, value in request.dict(exclude_unset=True).items():
         setattr(db_request, key, value)
+    counters.apply(db, counters.diff(before, counters.request_contribution(db_request, done_ids)))
+    db.flush()  # sets is_overdue
+    events.publish(db, events.request_event("updated", db_request, state_before))
 
     db.commit()
     db.refresh(db_request)
@@ -549,7 +912,7 @@ def update_request(request_id: int, request: schemas.MaintenanceRequestUpdate, d
 @app.post("/api/requests/{request_id}/assign-to-me", response_model=schemas.MaintenanceRequest)
 def assign_request_to_me(
     request_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.Principal = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Assign a maintenance request to the current user (only if they're in the team)"""
@@ -559,23 +922,257 @@ def assign_request_to_me(
 
     # Check if user is a member of the assigned maintenance team
     if db_request.maintenance_team_id:
-        team = db.query(models.Team).filter(models.Team.id == db_request.maintenance_team_id).first()
-        if team:
-            team_member_ids = [member.id for member in team.members]
-            if current_user.id not in team_member_ids and team.leader_id != current_user.id:
+        team = db.query(models.Team.leader_id).filter(models.Team.id == db_request.maintenance_team_id).first()
+        if team and team.leader_id != current_user.id:
+            is_member = db.query(exists().where(
+                models.team_members.c.team_id == db_request.maintenance_team_id,
+                models.team_members.c.user_id == current_user.id,
+            )).scalar()
+            if not is_member:
                 raise HTTPException(
                     status_code=403,
                     detail="You must be a member of the assigned maintenance team to assign this request to yourself"
                 )
 
     # Assign to current user
+    state_before = events.request_state(db_request)
     db_request.technician_id = current_user.id
+    events.publish(db, events.request_event("updated", db_request, state_before))
 
     db.commit()
     db.refresh(db_request)
     return db_request
 
 
+# ============================================================================
+# LIVE EVENTS
+# ============================================================================
+
+@app.get("/api/events")
+async def stream_events(request: Request, team_id: Optional[int] = None):
+    """
+    Server-Sent Events stream of request and equipment changes, optionally only
+    those touching one team. A `resync` event means the client missed events
+    and should refetch.
+    """
+    subscription = events.subscribe(team_id)
+
+    async def generate():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                message = await subscription.next(settings.events_keepalive)
+                yield message or ": keep-alive\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+
+@app.get("/api/search", response_model=schemas.SearchResults)
+def search_records(q: str, type: str = "all", limit: int = 20, db: Session = Depends(get_db)):
+    """
+    Full-text search over request names/descriptions and equipment names, serial
+    numbers, models and locations. The last word also matches as a prefix.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        raise HTTPException(status_code=501, detail="Search requires the SQLite database")
+    if type == "all":
+        kinds = list(search.INDEXES)
+    elif type in search.INDEXES:
+        kinds = [type]
+    else:
+        raise HTTPException(status_code=400, detail=f"Unsupported type '{type}'")
+    limit = max(1, min(limit, 100))
+    return {"query": q, "hits": search.search(db, q, kinds, limit)}
+
+
+# ============================================================================
+# KANBAN ENDPOINTS
+# ============================================================================
+
+KANBAN_ORDER = [(models.MaintenanceRequest.priority, True), (models.MaintenanceRequest.id, False)]
+
+
+def _kanban_cards(db: Session, team_id: Optional[int] = None):
+    """Card columns for active requests, with equipment and technician names joined in"""
+    request = models.MaintenanceRequest
+    query = db.query(
+        request.id,
+        request.name,
+        request.priority,
+        request.request_type,
+        request.stage_id,
+        request.equipment_id,
+        models.Equipment.name.label("equipment_name"),
+        request.technician_id,
+        models.User.name.label("technician_name"),
+        models.User.profile_picture.label("technician_avatar"),
+        request.schedule_date,
+        request.close_date,
+        request.is_overdue,
+        request.duration,
+    ).outerjoin(
+        models.Equipment, models.Equipment.id == request.equipment_id
+    ).outerjoin(
+        models.User, models.User.id == request.technician_id
+    ).filter(request.active == True)
+    if team_id:
+        query = query.filter(request.maintenance_team_id == team_id)
+    return query
+
+
+@app.get("/api/kanban", response_model=List[schemas.KanbanColumn])
+def get_kanban(limit: int = 20, team_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    Kanban board: every stage by sequence with its request count and first
+    `limit` cards. Folded stages only carry their count; load their cards
+    (and further pages of any column) from /api/kanban/{stage_id}.
+    """
+    count_query = db.query(models.MaintenanceRequest.stage_id, func.count()).filter(
+        models.MaintenanceRequest.active == True
+    )
+    if team_id:
+        count_query = count_query.filter(models.MaintenanceRequest.maintenance_team_id == team_id)
+    counts = dict(count_query.group_by(models.MaintenanceRequest.stage_id).all())
+
+    columns = []
+    for stage in stage_cache.get(db).stages:
+        count = counts.get(stage.id, 0)
+        cards, next_cursor = [], None
+        if count and not stage.fold:
+            query = _kanban_cards(db, team_id).filter(models.MaintenanceRequest.stage_id == stage.id)
+            cards, next_cursor = keyset_page(query, KANBAN_ORDER, limit)
+        columns.append({
+            "id": stage.id,
+            "name": stage.name,
+            "sequence": stage.sequence,
+            "fold": stage.fold,
+            "done": stage.done,
+            "is_scrap": stage.is_scrap,
+            "count": count,
+            "cards": cards,
+            "next_cursor": next_cursor,
+        })
+    return columns
+
+
+@app.get("/api/kanban/{stage_id}", response_model=schemas.KanbanCardPage)
+def get_kanban_column(
+    stage_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    team_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Next page of cards for one kanban column"""
+    query = _kanban_cards(db, team_id).filter(models.MaintenanceRequest.stage_id == stage_id)
+    cards, next_cursor = keyset_page(query, KANBAN_ORDER, limit, cursor=cursor)
+    return {"cards": cards, "next_cursor": next_cursor}
+
+
+# ============================================================================
+# CALENDAR ENDPOINTS
+# ============================================================================
+
+def _calendar_events(db: Session, team_id: Optional[int] = None, technician_id: Optional[int] = None,
+                     request_type: Optional[str] = None):
+    """Scheduled active requests with equipment and technician names, in schedule order"""
+    request = models.MaintenanceRequest
+    query = db.query(
+        request.id,
+        request.name,
+        request.request_type,
+        request.priority,
+        request.stage_id,
+        request.schedule_date,
+        request.close_date,
+        request.duration,
+        request.equipment_id,
+        models.Equipment.name.label("equipment_name"),
+        request.maintenance_team_id,
+        request.technician_id,
+        models.User.name.label("technician_name"),
+    ).outerjoin(
+        models.Equipment, models.Equipment.id == request.equipment_id
+    ).outerjoin(
+        models.User, models.User.id == request.technician_id
+    ).filter(request.active == True, request.schedule_date.isnot(None))
+    if team_id:
+        query = query.filter(request.maintenance_team_id == team_id)
+    if technician_id:
+        query = query.filter(request.technician_id == technician_id)
+    if request_type:
+        query = query.filter(request.request_type == request_type)
+    return query.order_by(request.schedule_date)
+
+
+@app.get("/api/calendar", response_model=List[schemas.CalendarEvent])
+def get_calendar(
+    start: date,
+    end: date,
+    team_id: Optional[int] = None,
+    request_type: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Requests whose scheduled time overlaps the days from `start` to `end` (inclusive)"""
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    window_start = datetime.combine(start, time.min)
+    window_end = datetime.combine(end, time.max)
+    request = models.MaintenanceRequest
+    # Requests that begin before the window can run into it: widen the indexed
+    # schedule_date range by the longest duration, then test the overlap exactly
+    longest = db.query(func.max(request.duration)).scalar() or 0
+    reach = timedelta(hours=max(longest, calendar_feed.DEFAULT_DURATION_HOURS))
+    events = _calendar_events(db, team_id=team_id, request_type=request_type).filter(
+        request.schedule_date > window_start - reach,
+        request.schedule_date <= window_end,
+    ).all()
+    return [event for event in events if calendar_feed.event_end(event) > window_start]
+
+
+@app.get("/api/calendar/feed.ics")
+def get_calendar_feed(
+    team_id: Optional[int] = None,
+    technician_id: Optional[int] = None,
+    start: Optional[datetime] = None
+):
+    """iCalendar feed of scheduled requests for a team or technician, streamed row by row"""
+    def generate():
+        # The request-scoped session is closed before streaming starts, so the feed owns its own
+        db = SessionLocal()
+        try:
+            name = "GearGuard Maintenance"
+            if team_id:
+                team = db.query(models.Team.name).filter(models.Team.id == team_id).first()
+                name = f"{name} - {team.name}" if team else name
+            elif technician_id:
+                user = db.query(models.User.name).filter(models.User.id == technician_id).first()
+                name = f"{name} - {user.name}" if user else name
+
+            query = _calendar_events(db, team_id=team_id, technician_id=technician_id)
+            if start:
+                query = query.filter(models.MaintenanceRequest.schedule_date >= start)
+            yield from calendar_feed.iter_calendar(query.yield_per(500), name)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/calendar; charset=utf-8",
+        headers={"Content-Disposition": 'inline; filename="gearguard.ics"'},
+    )
+
+
 # ============================================================================
 # DASHBOARD / STATISTICS ENDPOINTS
 # ============================================================================
@@ -583,36 +1180,150 @@ def assign_request_to_me(
 @app.get("/api/dashboard/stats", response_model=schemas.DashboardStats)
 def get_dashboard_stats(db: Session = Depends(get_db)):
     """Get dashboard statistics"""
-    total_equipment = db.query(models.Equipment).count()
-    active_equipment = db.query(models.Equipment).filter(models.Equipment.active == True).count()
-    scrapped_equipment = db.query(models.Equipment).filter(models.Equipment.is_scrap == True).count()
+    return counters.read(db)
+
+
+# ============================================================================
+# ANALYTICS ENDPOINTS
+# ============================================================================
 
-    total_requests = db.query(models.MaintenanceRequest).count()
+PRIORITY_LABELS = {"0": "Low", "1": "Medium", "2": "High", "3": "Urgent"}
+REQUEST_TYPE_LABELS = {"preventive": "Preventive", "corrective": "Corrective"}
 
-    # Get done stages
-    done_stages = db.query(models.Stage.id).filter(models.Stage.done == True).all()
-    done_stage_ids = [s[0] for s in done_stages]
 
-    open_requests = db.query(models.MaintenanceRequest).filter(
-        models.MaintenanceRequest.stage_id.notin_(done_stage_ids) if done_stage_ids else True
-    ).count()
+def _month_key(column):
+    """'YYYY-MM' bucket for a datetime column (works on SQLite and PostgreSQL)"""
+    return func.substr(cast(column, String), 1, 7)
 
-    completed_requests = db.query(models.MaintenanceRequest).filter(
-        models.MaintenanceRequest.stage_id.in_(done_stage_ids) if done_stage_ids else False
-    ).count()
 
-    urgent_requests = db.query(models.MaintenanceRequest).filter(
-        models.MaintenanceRequest.priority == "3"
-    ).count()
+def _months_before(day: date, months: int) -> date:
+    """First day of the month `months` calendar months before `day`"""
+    month_index = day.year * 12 + day.month - 1 - months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _trend_months(start: date, end: date) -> List[date]:
+    """First day of every month between start and end, inclusive"""
+    months = []
+    current = start.replace(day=1)
+    while current <= end:
+        months.append(current)
+        current = (current + timedelta(days=32)).replace(day=1)
+    return months
+
+
+@app.get("/api/analytics/summary", response_model=schemas.AnalyticsSummary)
+def get_analytics_summary(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    team_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Aggregated request analytics, computed in SQL for the analytics page"""
+    trend_end = date_to or date.today()
+    trend_start = date_from or _months_before(trend_end, 5)
+
+    # Filtered requests joined to their stage's done flag, shared by every breakdown
+    request = models.MaintenanceRequest
+    filtered = select(
+        request.stage_id,
+        request.priority,
+        request.request_type,
+        request.maintenance_team_id,
+        request.duration,
+        request.is_overdue,
+        _month_key(request.created_at).label("month"),
+        func.coalesce(models.Stage.done, False).label("done"),
+    ).outerjoin(models.Stage, models.Stage.id == request.stage_id)
+    if date_from:
+        filtered = filtered.where(request.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        filtered = filtered.where(request.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if team_id:
+        filtered = filtered.where(request.maintenance_team_id == team_id)
+    filtered = filtered.cte("filtered")
+    c = filtered.c
+
+    def kpi(key, condition=None):
+        value = func.count() if condition is None else func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+        return select(
+            literal("kpi").label("dimension"),
+            literal(key).label("key"),
+            null().label("subkey"),
+            value.label("count"),
+            null().label("value"),
+        ).select_from(filtered)
+
+    def grouped(dimension, key, subkey=None, value=None):
+        # Every breakdown shares the (dimension, key, subkey, count, value) row shape
+        group_by = [key] if subkey is None else [key, subkey]
+        return select(
+            literal(dimension).label("dimension"),
+            cast(key, String).label("key"),
+            (null() if subkey is None else subkey).label("subkey"),
+            func.count().label("count"),
+            (null() if value is None else value).label("value"),
+        ).select_from(filtered).group_by(*group_by)
+
+    statement = union_all(
+        kpi("total"),
+        kpi("open", c.done == False),
+        kpi("completed", c.done == True),
+        kpi("overdue", c.is_overdue == True),
+        grouped("stage", c.stage_id),
+        grouped("priority", c.priority, value=func.avg(c.duration)),
+        grouped("type", c.request_type),
+        grouped("team", c.maintenance_team_id),
+        grouped("month", c.month, subkey=c.request_type).where(c.month >= trend_start.strftime("%Y-%m")),
+    )
+
+    # One statement, so every breakdown comes from the same snapshot
+    rows = db.execute(statement).all()
+
+    totals = {"kpi": {}, "stage": {}, "priority": {}, "type": {}, "team": {}}
+    avg_duration = {}
+    monthly = {}
+    for dimension, key, subkey, count, value in rows:
+        if dimension == "month":
+            bucket = monthly.setdefault(key, {})
+            bucket[subkey] = bucket.get(subkey, 0) + count
+            continue
+        totals[dimension][key] = count
+        if dimension == "priority":
+            avg_duration[key] = value or 0
+
+    stages = [(stage.id, stage.name) for stage in stage_cache.get(db).stages]
+    teams_query = db.query(models.Team.id, models.Team.name).filter(models.Team.active == True)
+    if team_id:
+        teams_query = teams_query.filter(models.Team.id == team_id)
+    teams = teams_query.all()
+
+    monthly_trend = []
+    for month in _trend_months(trend_start, trend_end):
+        bucket = monthly.get(month.strftime("%Y-%m"), {})
+        monthly_trend.append({
+            "month": month.strftime("%b %Y"),
+            "total": sum(bucket.values()),
+            "preventive": bucket.get("preventive", 0),
+            "corrective": bucket.get("corrective", 0),
+        })
 
     return {
-        "total_equipment": total_equipment,
-        "active_equipment": active_equipment,
-        "scrapped_equipment": scrapped_equipment,
-        "total_requests": total_requests,
-        "open_requests": open_requests,
-        "completed_requests": completed_requests,
-        "urgent_requests": urgent_requests
+        "kpis": {
+            "total_requests": totals["kpi"].get("total", 0),
+            "open_requests": totals["kpi"].get("open", 0),
+            "completed_requests": totals["kpi"].get("completed", 0),
+            "overdue_requests": totals["kpi"].get("overdue", 0),
+        },
+        "by_stage": [{"name": name, "count": totals["stage"].get(str(stage_id), 0)} for stage_id, name in stages],
+        "by_priority": [{"name": label, "count": totals["priority"].get(key, 0)} for key, label in PRIORITY_LABELS.items()],
+        "by_type": [{"name": label, "count": totals["type"].get(key, 0)} for key, label in REQUEST_TYPE_LABELS.items()],
+        "by_team": [{"name": name, "count": totals["team"].get(str(tid), 0)} for tid, name in teams],
+        "monthly_trend": monthly_trend,
+        "avg_duration_by_priority": [
+            {"name": label, "avg_duration": round(avg_duration.get(key, 0), 1)}
+            for key, label in PRIORITY_LABELS.items()
+        ],
     }
 
 
@@ -1,5 +1,5 @@
 """SQLAlchemy models - converted from Odoo models"""
-from sqlalchemy import Boolean, Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, Table
+from sqlalchemy import Boolean, Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, Table, Index, false
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -96,6 +96,12 @@ class Equipment(Base):
     # Maintenance Assignment
     maintenance_team_id = Column(Integer, ForeignKey("teams.id"))
     technician_id = Column(Integer, ForeignKey("users.id"))
+
+    # Preventive Maintenance: every `maintenance_interval` days, months or usage hours
+    maintenance_interval = Column(Integer)
+    maintenance_interval_unit = Column(String)  # days, months or hours
+    usage_hours_per_day = Column(Float)  # expected usage, turns hour intervals into dates
+    next_preventive_date = Column(Date, index=True)  # next occurrence not generated yet (see preventive.py)
     
     # Technical Details
     note = Column(Text)
@@ -135,6 +141,31 @@ class Stage(Base):
 class MaintenanceRequest(Base):
     """Maintenance Request"""
     __tablename__ = "maintenance_requests"
+    __table_args__ = (
+        # Default request list and its keyset pages: active, ordered by priority desc, id
+        Index("ix_maintenance_requests_active_priority", "active", Column("priority").desc(), "id"),
+        # Request list / kanban filtered by stage, same ordering
+        Index("ix_maintenance_requests_active_stage_priority", "active", "stage_id", Column("priority").desc(), "id"),
+        # Request list filtered by team or by equipment, same ordering; the equipment
+        # one also serves the equipment history and per-equipment statistics
+        Index("ix_maintenance_requests_team_priority", "maintenance_team_id", "active", Column("priority").desc(), "id"),
+        Index("ix_maintenance_requests_equipment_priority", "equipment_id", "active", Column("priority").desc(), "id"),
+        # Per-team stage breakdowns (counter rebuilds), answered from the index alone
+        Index("ix_maintenance_requests_team_stage", "maintenance_team_id", "stage_id"),
+        # Overdue counts and lists, overall and per team (only overdue rows, so sweeps
+        # looking for is_overdue = 0 use the schedule_date index instead)
+        Index(
+            "ix_maintenance_requests_overdue_team", "maintenance_team_id",
+            sqlite_where=Column("is_overdue") == True,
+            postgresql_where=Column("is_overdue") == True,
+        ),
+        # One generated preventive request per equipment and occurrence (NULLs do not collide)
+        Index("uq_maintenance_requests_equipment_due", "equipment_id", "due_date", unique=True),
+        # Calendar date window, calendar feed and overdue sweeps
+        Index("ix_maintenance_requests_schedule", "schedule_date"),
+        # Longest duration, which bounds how far before its window the calendar looks
+        Index("ix_maintenance_requests_duration", "duration"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)  # Subject/Title
@@ -155,6 +186,9 @@ class MaintenanceRequest(Base):
     # Scheduling
     schedule_date = Column(DateTime)
     close_date = Column(DateTime)
+    due_date = Column(Date)  # preventive occurrence this request was generated for
+    # Scheduled in the past and not in a done stage (maintained by overdue.py)
+    is_overdue = Column(Boolean, nullable=False, default=False, server_default=false())
     duration = Column(Float)  # hours
     
     # Stage
@@ -172,3 +206,53 @@ class MaintenanceRequest(Base):
     technician = relationship("User", back_populates="assigned_requests")
     stage = relationship("Stage", back_populates="requests")
 
+
+
+class Counter(Base):
+    """Incrementally maintained dashboard counter (see counters.py)"""
+    __tablename__ = "counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class CacheVersion(Base):
+    """Per-table change counter, bumped by writers so every worker can detect stale caches"""
+    __tablename__ = "cache_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class ChangeEvent(Base):
+    """Published change notification, polled by every worker when EVENTS_BACKEND=sqlite (see events.py)"""
+    __tablename__ = "change_events"
+    # Ids never restart, even after a prune empties the table: pollers resume from the last id they saw
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, nullable=False, index=True)
+
+
+class Job(Base):
+    """Queued background work, run by the worker threads of every API process (see jobs.py)"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Claiming the next due job
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON keyword arguments of the handler
+    priority = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False, default="queued")  # queued, running, done, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_after = Column(DateTime, nullable=False)  # when due; while running, when the lease expires
+    last_error = Column(Text)
+    result = Column(Text)  # JSON
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
@@ -0,0 +1,171 @@
+"""
+Stored overdue flag for maintenance requests
+A request is overdue when its schedule date has passed and its stage is not
+done (as Odoo's _compute_is_overdue). ORM writes set the flag when they
+flush and bulk updates in SQL; a background sweeper flags requests as their
+schedule dates pass, which a stored compute never notices. The
+overdue_requests dashboard counter follows every change of the flag.
+"""
+import itertools
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+from sqlalchemy import DateTime, Integer, and_, case, event, inspect, literal, not_, or_, select, true, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+import counters
+import models
+import schema_upgrade
+import stage_cache
+import versions
+from database import SessionLocal
+from settings import settings
+
+COUNTER_NAME = "overdue_requests"
+INDEX_NAME = "ix_maintenance_requests_overdue_team"
+# Sweeps between full passes, which also clear flags that no longer hold (e.g. a stage became done)
+FULL_SWEEP_EVERY = 60
+
+Request = models.MaintenanceRequest
+table = Request.__table__
+
+
+def is_overdue(stage_id: Optional[int], schedule_date: Optional[datetime], done_ids: Iterable[int], now: datetime) -> bool:
+    """Whether a request with this stage and schedule date is overdue at `now`"""
+    if schedule_date is None or stage_id in done_ids:
+        return False
+    # Stored without an offset, so compare wall-clock times like the SQL condition does
+    return schedule_date.replace(tzinfo=None) < now
+
+
+def condition(done_ids: Iterable[int], now: datetime, stage_id=table.c.stage_id, schedule_date=table.c.schedule_date):
+    """SQL form of is_overdue over the given columns or values"""
+    done_ids = list(done_ids)
+    not_done = or_(stage_id.is_(None), stage_id.notin_(done_ids)) if done_ids else true()
+    return and_(not_done, schedule_date.isnot(None), schedule_date < now)
+
+
+def expression(done_ids: Iterable[int], now: datetime, patch: Dict):
+    """New is_overdue value for an UPDATE applying `patch` (SET expressions see the old row)"""
+    stage_id = literal(patch["stage_id"], Integer) if "stage_id" in patch else table.c.stage_id
+    schedule_date = literal(patch["schedule_date"], DateTime) if "schedule_date" in patch else table.c.schedule_date
+    return case((condition(done_ids, now, stage_id, schedule_date), True), else_=False)
+
+
+def _done_ids(execute) -> list:
+    # Read stages directly: a stage may have changed in the current transaction
+    return list(execute(select(models.Stage.id).where(models.Stage.done == True)).scalars())
+
+
+def sync(db: Session, since: Optional[datetime] = None, now: Optional[datetime] = None) -> int:
+    """
+    Flag requests that became overdue, with set-based UPDATEs: those scheduled
+    in [since, now), or all of them when `since` is None, in which case stale
+    flags are cleared too. Returns the number of rows changed; the caller commits.
+    """
+    db.flush()
+    now = now or datetime.now()
+    overdue = condition(_done_ids(db.execute), now)
+    window = [table.c.schedule_date >= since] if since is not None else []
+
+    raised = db.execute(
+        update(table).where(table.c.is_overdue == False, overdue, *window).values(is_overdue=True)
+    ).rowcount
+    cleared = 0
+    if since is None:
+        cleared = db.execute(
+            update(table).where(table.c.is_overdue == True, not_(overdue)).values(is_overdue=False)
+        ).rowcount
+
+    if raised or cleared:
+        counters.apply(db, {COUNTER_NAME: raised - cleared})
+        versions.bump(db, table.name)
+    return raised + cleared
+
+
+class Sweeper:
+    """Background thread running sync() every `interval` seconds"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="overdue-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _sweep(self, since: Optional[datetime]) -> datetime:
+        now = datetime.now()
+        with SessionLocal() as db:
+            sync(db, since, now)
+            db.commit()
+        return now
+
+    def _run(self):
+        since = None
+        for sweeps in itertools.count():
+            if sweeps % FULL_SWEEP_EVERY == 0:
+                since = None
+            try:
+                # Windows overlap by one interval so rows committed during a sweep are not missed
+                since = self._sweep(since) - timedelta(seconds=self.interval)
+            except Exception as e:
+                # Keep the old window start so the next sweep covers this one
+                print(f"✗ Overdue sweep failed: {e}")
+            if self._stopping.wait(self.interval):
+                break
+
+
+sweeper = Sweeper(settings.overdue_sweep_interval)
+
+
+@event.listens_for(Session, "before_flush")
+def _flag_flushed_requests(session: Session, flush_context, instances):
+    """
+    Set is_overdue on new requests and on those whose stage or schedule date
+    changed. The counter delta uses the flag as loaded, so handlers changing
+    existing requests load them locked (database.begin_write).
+    """
+    now = datetime.now()
+    done_ids = None
+    delta = 0
+    for request in itertools.chain(session.new, session.dirty):
+        if not isinstance(request, Request):
+            continue
+        state = inspect(request)
+        if not state.pending and not (
+            state.attrs.stage_id.history.has_changes() or state.attrs.schedule_date.history.has_changes()
+        ):
+            continue
+        if done_ids is None:
+            with session.no_autoflush:
+                done_ids = stage_cache.get(session).done_ids
+        flag = is_overdue(request.stage_id, request.schedule_date, done_ids, now)
+        delta += int(flag) - int(bool(request.is_overdue))
+        request.is_overdue = flag
+    for request in session.deleted:
+        if isinstance(request, Request):
+            delta -= int(bool(request.is_overdue))
+    if delta:
+        counters.apply(session, {COUNTER_NAME: delta})
+
+
+@event.listens_for(models.Base.metadata, "after_create")
+def _add_flag_column(target, connection: Connection, **kw):
+    """Databases created before the flag existed get the column, its index and initial values"""
+    if not schema_upgrade.add_columns(connection, table, ["is_overdue"]):
+        return
+    schema_upgrade.create_indexes(connection, table, [INDEX_NAME])
+    connection.execute(
+        update(table).where(condition(_done_ids(connection.execute), datetime.now())).values(is_overdue=True)
+    )
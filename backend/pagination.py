@@ -0,0 +1,102 @@
+"""
+Keyset (cursor) pagination for list endpoints
+Cursors are opaque base64 tokens holding the sort key of the last row served,
+so each page is an index range scan instead of walking `skip` rows. NULLs sort
+lowest: first in ascending and last in descending order, on every database.
+"""
+import base64
+import json
+from typing import Any, List, Sequence, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, false, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode sort key values as an opaque URL-safe token"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a token produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _check_value(column, value):
+    """Reject cursor values the column could not hold (they would fail in the query instead)"""
+    if value is None:
+        valid = column.nullable
+    else:
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            python_type = (str, int, float)
+        valid = isinstance(value, python_type) and not isinstance(value, bool)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _order_by(column, descending: bool):
+    """Sort clause with NULLs lowest; PostgreSQL and Oracle sort them highest by default"""
+    if descending:
+        return column.desc().nulls_last() if column.nullable else column.desc()
+    return column.asc().nulls_first() if column.nullable else column.asc()
+
+
+def _after(column, descending: bool, value):
+    """Rows strictly after `value` in the column's sort direction (NULLs sort lowest, see _order_by)"""
+    if value is None:
+        return false() if descending else column.isnot(None)
+    if descending:
+        return or_(column < value, column.is_(None))
+    return column > value
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def keyset_page(query, order: Sequence[Tuple[Any, bool]], limit: int, skip: int = 0, cursor: str = None):
+    """
+    Order `query` by `order` ((column, descending) pairs, ending in a unique
+    column) and return (rows, next_cursor) for one page. A cursor takes
+    precedence over the legacy skip offset; next_cursor is None on the last page.
+    """
+    if limit <= 0:
+        return [], None
+    query = query.order_by(*(_order_by(column, descending) for column, descending in order))
+
+    if cursor:
+        values = decode_cursor(cursor, len(order))
+        for (column, _), value in zip(order, values):
+            _check_value(column, value)
+        clauses = []
+        for position, (column, descending) in enumerate(order):
+            prefix = [_equal(col, value) for (col, _), value in zip(order[:position], values[:position])]
+            clauses.append(and_(*prefix, _after(column, descending, values[position])))
+        query = query.filter(or_(*clauses))
+    elif skip:
+        query = query.offset(skip)
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([getattr(rows[-1], column.key) for column, _ in order])
+
+
+def paginate(query, order: Sequence[Tuple[Any, bool]], response: Response, limit: int, skip: int = 0, cursor: str = None):
+    """keyset_page for list endpoints, sending the next cursor in X-Next-Cursor"""
+    rows, next_cursor = keyset_page(query, order, limit, skip, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows
@@ -0,0 +1,18 @@
+"""
+bcrypt work, kept free of app imports so pool worker processes start quickly
+"""
+import bcrypt
+
+
+def hash_password(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def check_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def hash_rounds(hashed: str) -> int:
+    """Cost factor of a $2b$NN$... hash (0 if unrecognised)"""
+    parts = hashed.split('$')
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else 0
@@ -0,0 +1,200 @@
+"""
+Preventive maintenance schedule generator
+Equipment with a recurrence rule (every N days, N months or N usage hours)
+gets one preventive request per occurrence up to a rolling horizon. Runs are
+incremental: only equipment whose next_preventive_date falls inside the
+horizon is read, requests are bulk-inserted per batch of equipment, and the
+unique (equipment_id, due_date) key makes re-running a batch harmless.
+`python preventive.py [days]` generates for the next `days` days.
+"""
+import itertools
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, List, Mapping, Optional, Tuple
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import bindparam, event, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+import counters
+import models
+import overdue
+import schema_upgrade
+import stage_cache
+import versions
+
+UNITS = ("days", "months", "hours")
+RULE_FIELDS = ("maintenance_interval", "maintenance_interval_unit", "usage_hours_per_day")
+PRIORITY = "1"
+# Equipment per transaction
+BATCH_SIZE = 2000
+
+Equipment = models.Equipment
+equipment_table = Equipment.__table__
+requests_table = models.MaintenanceRequest.__table__
+
+
+def check_rule(values: Mapping) -> Optional[str]:
+    """Reason the recurrence rule in `values` is invalid, if any (no interval means no rule)"""
+    interval = values.get("maintenance_interval")
+    if interval is None:
+        return None
+    if interval <= 0:
+        return "maintenance_interval must be positive"
+    unit = values.get("maintenance_interval_unit")
+    if unit not in UNITS:
+        return f"maintenance_interval_unit must be one of: {', '.join(UNITS)}"
+    if unit == "hours" and not (values.get("usage_hours_per_day") or 0) > 0:
+        return "usage_hours_per_day must be positive for intervals in hours"
+    return None
+
+
+def occurrence(start: date, interval: int, unit: str, usage_hours_per_day: Optional[float], n: int) -> date:
+    """The n-th occurrence of a rule starting at `start` (n = 0 is `start` itself)"""
+    if unit == "months":
+        # From the start every time, so the 31st does not drift to the 28th
+        return start + relativedelta(months=interval * n)
+    days = interval if unit == "days" else max(interval / usage_hours_per_day, 1)
+    return start + timedelta(days=round(days * n))
+
+
+def first_date(values: Mapping, today: date) -> Optional[date]:
+    """next_preventive_date for a new or changed rule: the one given, else one interval from today"""
+    if values.get("maintenance_interval") is None:
+        return None
+    if values.get("next_preventive_date") is not None:
+        return values["next_preventive_date"]
+    return occurrence(
+        today, values["maintenance_interval"], values["maintenance_interval_unit"], values.get("usage_hours_per_day"), 1
+    )
+
+
+def rule_of(equipment: models.Equipment) -> Dict:
+    return {name: getattr(equipment, name) for name in RULE_FIELDS}
+
+
+def initial_stage_id(stages: stage_cache.StageSnapshot) -> Optional[int]:
+    """Stage generated requests start in: the first one that is neither done nor scrap"""
+    return next((stage.id for stage in stages.stages if not stage.done and not stage.is_scrap), None)
+
+
+def plan(equipment, until: date, today: date) -> Tuple[List[date], date]:
+    """Occurrences from next_preventive_date up to `until`, and the first occurrence after them"""
+    dues = []
+    for n in itertools.count():
+        due = occurrence(
+            equipment.next_preventive_date, equipment.maintenance_interval,
+            equipment.maintenance_interval_unit, equipment.usage_hours_per_day, n,
+        )
+        if due > until:
+            break
+        dues.append(due)
+    # Occurrences missed while no run happened collapse into the latest one
+    missed = [day for day in dues if day < today]
+    return missed[-1:] + [day for day in dues if day >= today], due
+
+
+def _insert_statement(db: Session):
+    """INSERT that skips occurrences already generated"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise NotImplementedError(f"Preventive scheduling is not supported on {dialect}")
+    return insert(requests_table).on_conflict_do_nothing(index_elements=["equipment_id", "due_date"])
+
+
+def generate(db: Session, until: date, today: Optional[date] = None) -> Dict:
+    """
+    Create the preventive requests due up to `until` and move each equipment's
+    next_preventive_date past it, committing per batch of equipment.
+    """
+    today = today or date.today()
+    now = datetime.now()
+    stages = stage_cache.get(db)
+    stage_id = initial_stage_id(stages)
+    statement = _insert_statement(db)
+    move = (
+        update(equipment_table)
+        .where(equipment_table.c.id == bindparam("b_id"))
+        .values(next_preventive_date=bindparam("b_next"))
+    )
+    # Every generated request adds the same to the counters
+    contribution = counters.request_contribution(SimpleNamespace(stage_id=stage_id, priority=PRIORITY), stages.done_ids)
+
+    due_equipment = db.execute(
+        select(
+            Equipment.id, Equipment.name, Equipment.maintenance_team_id, Equipment.technician_id,
+            *(getattr(Equipment, name) for name in RULE_FIELDS), Equipment.next_preventive_date,
+        ).where(
+            Equipment.next_preventive_date <= until,
+            Equipment.maintenance_interval.isnot(None),
+            Equipment.active == True,
+            Equipment.is_scrap == False,
+        ).order_by(Equipment.id)
+    ).all()
+
+    report = {"until": until, "equipment": len(due_equipment), "created": 0, "skipped": 0}
+    for start in range(0, len(due_equipment), BATCH_SIZE):
+        rows: Dict[bool, List[Dict]] = {False: [], True: []}  # by is_overdue
+        moves = []
+        for equipment in due_equipment[start:start + BATCH_SIZE]:
+            dues, next_date = plan(equipment, until, today)
+            for due in dues:
+                schedule_date = datetime.combine(due, datetime.min.time())
+                flag = overdue.is_overdue(stage_id, schedule_date, stages.done_ids, now)
+                rows[flag].append({
+                    "name": f"{equipment.name} - Preventive maintenance",
+                    "active": True,
+                    "request_type": "preventive",
+                    "priority": PRIORITY,
+                    "equipment_id": equipment.id,
+                    "maintenance_team_id": equipment.maintenance_team_id,
+                    "technician_id": equipment.technician_id,
+                    "schedule_date": schedule_date,
+                    "due_date": due,
+                    "stage_id": stage_id,
+                    "is_overdue": flag,
+                })
+            moves.append({"b_id": equipment.id, "b_next": next_date})
+
+        created = {flag: db.execute(statement, group).rowcount if group else 0 for flag, group in rows.items()}
+        total = created[False] + created[True]
+        if total:
+            counters.apply(db, {name: value * total for name, value in contribution.items()})
+            counters.apply(db, {overdue.COUNTER_NAME: created[True]})
+            versions.bump(db, requests_table.name)
+        db.execute(move, moves)
+        versions.bump(db, equipment_table.name)
+        db.commit()
+
+        report["created"] += total
+        report["skipped"] += len(rows[False]) + len(rows[True]) - total
+    return report
+
+
+@event.listens_for(models.Base.metadata, "after_create")
+def _add_schedule_columns(target, connection: Connection, **kw):
+    """Databases created before preventive scheduling get its columns and indexes"""
+    schema_upgrade.add_columns(connection, equipment_table, [*RULE_FIELDS, "next_preventive_date"])
+    schema_upgrade.create_indexes(connection, equipment_table, ["ix_equipment_next_preventive_date"])
+    schema_upgrade.add_columns(connection, requests_table, ["due_date"])
+    schema_upgrade.create_indexes(connection, requests_table, ["uq_maintenance_requests_equipment_due"])
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal, engine
+    from settings import settings
+
+    models.Base.metadata.create_all(bind=engine)
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else settings.preventive_horizon_days
+    db = SessionLocal()
+    try:
+        report = generate(db, date.today() + timedelta(days=days))
+        print(f"✅ {report['created']} preventive requests for {report['equipment']} equipment up to {report['until']}")
+        if report["skipped"]:
+            print(f"✓ {report['skipped']} occurrences already existed")
+    finally:
+        db.close()
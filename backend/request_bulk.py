@@ -0,0 +1,229 @@
+"""
+Bulk updates for maintenance requests
+Items sharing the same patch are applied with one UPDATE per chunk of ids, and
+stage transitions (close_date on done stages, equipment scrap on scrap stages)
+are expressed in SQL instead of per-row ORM changes. Everything commits at once.
+"""
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+from fastapi import HTTPException
+from sqlalchemy import and_, case, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import counters
+import events
+import models
+import overdue
+import schemas
+import stage_cache
+from database import begin_write
+
+CHUNK_SIZE = 500
+
+Request = models.MaintenanceRequest
+LOAD_COLUMNS = (
+    Request.id, Request.stage_id, Request.priority, Request.equipment_id, Request.maintenance_team_id,
+    Request.schedule_date, Request.is_overdue,
+)
+
+
+def _chunks(ids: List[int]) -> Iterable[List[int]]:
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def _filter_criteria(filter: schemas.MaintenanceRequestBulkFilter) -> List:
+    """WHERE clauses for a bulk filter, mirroring the GET /api/requests filters"""
+    criteria = []
+    if filter.active_only:
+        criteria.append(Request.active == True)
+    if filter.equipment_id is not None:
+        criteria.append(Request.equipment_id == filter.equipment_id)
+    if filter.team_id is not None:
+        criteria.append(Request.maintenance_team_id == filter.team_id)
+    if filter.technician_id is not None:
+        criteria.append(Request.technician_id == filter.technician_id)
+    if filter.stage_id is not None:
+        criteria.append(Request.stage_id == filter.stage_id)
+    if filter.request_type is not None:
+        criteria.append(Request.request_type == filter.request_type)
+    return criteria
+
+
+def load_rows(db: Session, criteria: List, ids: Optional[List[int]] = None) -> List:
+    """Narrow rows (LOAD_COLUMNS) matching the criteria, locked until the caller commits"""
+    if ids is None:
+        return db.query(*LOAD_COLUMNS).filter(*criteria).order_by(Request.id).with_for_update().all()
+    rows = []
+    for chunk in _chunks(sorted(set(ids))):
+        rows.extend(db.query(*LOAD_COLUMNS).filter(Request.id.in_(chunk), *criteria).with_for_update())
+    return rows
+
+
+def _merge(deltas: Dict[str, int], changes: Dict[str, int]):
+    for name, delta in changes.items():
+        deltas[name] = deltas.get(name, 0) + delta
+
+
+def check_patch(patch: Dict, stages: stage_cache.StageSnapshot) -> Optional[str]:
+    """Reason the patch cannot be applied, if any"""
+    if patch.get("name", "") is None:
+        return "name cannot be null"
+    stage_id = patch.get("stage_id")
+    if stage_id is not None and stage_id not in stages.by_id:
+        return f"Stage {stage_id} not found"
+    return None
+
+
+def apply_patch(db: Session, rows: List, patch: Dict, stages: stage_cache.StageSnapshot) -> Dict[str, int]:
+    """Apply one patch to every row with set-based UPDATEs and return the counter deltas"""
+    if not rows or not patch:
+        return {}
+    ids = [row.id for row in rows]
+    values = dict(patch)
+    deltas: Dict[str, int] = {}
+
+    stage = stages.by_id.get(patch["stage_id"]) if patch.get("stage_id") else None
+    if stage:
+        moving = or_(Request.stage_id.is_(None), Request.stage_id != stage.id)
+
+        # If moving to done stage, set close_date (an explicit close_date in the patch wins)
+        if stage.done and "close_date" not in patch:
+            values["close_date"] = case(
+                (and_(moving, Request.close_date.is_(None)), datetime.now()),
+                else_=Request.close_date,
+            )
+
+        # If moving to scrap stage, mark equipment as scrapped
+        equipment_ids = sorted({row.equipment_id for row in rows if row.stage_id != stage.id})
+        if stage.is_scrap and equipment_ids:
+            equipment = models.Equipment
+            scrapped = {"is_scrap": True, "scrap_date": date.today(), "active": False}
+            for chunk in _chunks(equipment_ids):
+                found = db.query(
+                    equipment.id, equipment.maintenance_team_id, equipment.active, equipment.is_scrap
+                ).filter(equipment.id.in_(chunk)).with_for_update().all()
+                if not found:
+                    continue
+                _merge(deltas, {
+                    "active_equipment": -sum(1 for item in found if item.active),
+                    "scrapped_equipment": sum(1 for item in found if not item.is_scrap),
+                })
+                db.execute(
+                    update(equipment)
+                    .where(equipment.id.in_([item.id for item in found]))
+                    .values(**scrapped)
+                    .execution_options(synchronize_session=False)
+                )
+                for item in found:
+                    events.publish(db, events.equipment_scrapped_event(
+                        SimpleNamespace(id=item.id, maintenance_team_id=item.maintenance_team_id, **scrapped)
+                    ))
+
+    # Re-evaluate the overdue flag when the stage or schedule date changes
+    now = datetime.now()
+    reflag = "stage_id" in patch or "schedule_date" in patch
+    flags: Dict[int, bool] = {}
+    if reflag:
+        values["is_overdue"] = overdue.expression(stages.done_ids, now, patch)
+
+    for row in rows:
+        after = SimpleNamespace(
+            stage_id=patch.get("stage_id", row.stage_id),
+            priority=patch.get("priority", row.priority),
+        )
+        _merge(deltas, counters.diff(
+            counters.request_contribution(row, stages.done_ids),
+            counters.request_contribution(after, stages.done_ids),
+        ))
+        if reflag:
+            flags[row.id] = overdue.is_overdue(
+                after.stage_id, patch.get("schedule_date", row.schedule_date), stages.done_ids, now
+            )
+            _merge(deltas, {overdue.COUNTER_NAME: int(flags[row.id]) - int(bool(row.is_overdue))})
+
+    for chunk in _chunks(ids):
+        db.execute(
+            update(Request)
+            .where(Request.id.in_(chunk))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+    for row in rows:
+        changes = {**patch, "is_overdue": flags[row.id]} if reflag else patch
+        events.publish(db, events.make_event(
+            "request.updated", row.id, changes,
+            stage_id=patch.get("stage_id", row.stage_id),
+            team_ids=(row.maintenance_team_id, patch.get("maintenance_team_id")),
+        ))
+    return deltas
+
+
+def bulk_update(db: Session, body: schemas.MaintenanceRequestBulkUpdate) -> Dict:
+    """Apply a bulk update in one transaction and return per-item results"""
+    try:
+        results = _apply(db, body)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Bulk update violates a database constraint")
+
+    updated = sum(1 for result in results if result["status"] == "updated")
+    return {"updated": updated, "failed": len(results) - updated, "results": results}
+
+
+def _apply(db: Session, body: schemas.MaintenanceRequestBulkUpdate) -> List[Dict]:
+    if (body.items is None) == (body.filter is None):
+        raise HTTPException(status_code=400, detail="Provide either items or filter with patch")
+
+    # The counter deltas are computed from the rows as loaded, so no other writer may change them first
+    begin_write(db)
+    stages = stage_cache.get(db)
+    deltas: Dict[str, int] = {}
+    results: List[Dict] = []
+
+    if body.filter is not None:
+        patch = body.patch.model_dump(exclude_unset=True) if body.patch else {}
+        if not patch:
+            raise HTTPException(status_code=400, detail="A filter update needs a non-empty patch")
+        criteria = _filter_criteria(body.filter)
+        if body.filter.ids is None and len(criteria) == int(body.filter.active_only):
+            raise HTTPException(status_code=400, detail="Filter must restrict ids or at least one field")
+        error = check_patch(patch, stages)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        rows = load_rows(db, criteria, body.filter.ids)
+        _merge(deltas, apply_patch(db, rows, patch, stages))
+        results = [{"id": row.id, "status": "updated"} for row in rows]
+    else:
+        # Group items by identical patch so each group is a single UPDATE
+        results = [None] * len(body.items)
+        groups: Dict[tuple, List[int]] = {}
+        seen = set()
+        for position, item in enumerate(body.items):
+            if item.id in seen:
+                results[position] = {"id": item.id, "status": "error", "error": "Duplicate id in batch"}
+                continue
+            seen.add(item.id)
+            patch = item.model_dump(exclude_unset=True, exclude={"id"})
+            groups.setdefault(tuple(sorted(patch.items())), []).append(position)
+
+        rows = {row.id: row for row in load_rows(db, [], list(seen))}
+        for key, positions in groups.items():
+            patch = dict(key)
+            error = check_patch(patch, stages)
+            matched = []
+            for position in positions:
+                item_id = body.items[position].id
+                if item_id not in rows:
+                    results[position] = {"id": item_id, "status": "not_found", "error": "Request not found"}
+                elif error:
+                    results[position] = {"id": item_id, "status": "error", "error": error}
+                else:
+                    results[position] = {"id": item_id, "status": "updated"}
+                    matched.append(rows[item_id])
+            _merge(deltas, apply_patch(db, matched, patch, stages))
+
+    counters.apply(db, deltas)
+    return results
@@ -0,0 +1,28 @@
+"""
+Additive upgrades for existing databases
+create_all() only creates missing tables. Columns added to existing tables
+later are added here (from metadata after_create listeners), together with
+their indexes, the next time the API starts.
+"""
+from typing import Iterable, List
+from sqlalchemy import Table, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+
+
+def add_columns(connection: Connection, table: Table, names: Iterable[str]) -> List[str]:
+    """Add the named columns of `table` that the database lacks; returns the names added"""
+    existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    added = [name for name in names if name not in existing]
+    for name in added:
+        definition = CreateColumn(table.c[name]).compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {definition}"))
+    return added
+
+
+def create_indexes(connection: Connection, table: Table, names: Iterable[str]):
+    """Create the named indexes of `table` that the database lacks"""
+    existing = {index["name"] for index in inspect(connection).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name in names and index.name not in existing:
+            index.create(connection)
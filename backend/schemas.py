@@ -1,7 +1,7 @@
 """Pydantic schemas for request/response validation"""
 from __future__ import annotations
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, Json
+from typing import Any, Dict, Optional, List
 from datetime import date, datetime
 
 
@@ -135,6 +135,10 @@ class EquipmentBase(BaseModel):
     location: Optional[str] = None
     maintenance_team_id: Optional[int] = None
     technician_id: Optional[int] = None
+    maintenance_interval: Optional[int] = None
+    maintenance_interval_unit: Optional[str] = None  # days, months or hours
+    usage_hours_per_day: Optional[float] = None
+    next_preventive_date: Optional[date] = None
     note: Optional[str] = None
     is_scrap: Optional[bool] = False
     scrap_date: Optional[date] = None
@@ -151,6 +155,13 @@ class Equipment(EquipmentBase):
         from_attributes = True
 
 
+class EquipmentWithStats(Equipment):
+    """Equipment with its maintenance statistics (active requests only)"""
+    maintenance_count: int = 0
+    maintenance_open_count: int = 0  # not in a done stage
+    next_maintenance_date: Optional[date] = None  # earliest open request scheduled today or later
+
+
 class EquipmentDetails(BaseModel):
     """Equipment details for auto-population in maintenance requests"""
     id: int
@@ -164,6 +175,43 @@ class EquipmentDetails(BaseModel):
         from_attributes = True
 
 
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportReport(BaseModel):
+    """Result of a bulk import; errors lists at most the first 1000 failed rows"""
+    total_rows: int
+    inserted: int
+    failed: int
+    errors: List[ImportRowError]
+
+
+# Background Job Schemas
+class Job(BaseModel):
+    """Background job; times are UTC"""
+    id: int
+    kind: str
+    payload: Json[Dict[str, Any]]
+    priority: int
+    status: str  # queued, running, done, dead
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    last_error: Optional[str] = None
+    result: Optional[Json[Any]] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class JobQueueStatus(BaseModel):
+    counts: Dict[str, Dict[str, int]]  # kind -> status -> number of jobs
+    jobs: List[Job]
+
+
 # Stage Schemas
 class StageBase(BaseModel):
     name: str
@@ -216,6 +264,8 @@ class MaintenanceRequestUpdate(BaseModel):
 
 class MaintenanceRequest(MaintenanceRequestBase):
     id: int
+    is_overdue: bool = False
+    due_date: Optional[date] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -223,6 +273,107 @@ class MaintenanceRequest(MaintenanceRequestBase):
         from_attributes = True
 
 
+# Bulk Request Update Schemas
+class MaintenanceRequestBulkItem(MaintenanceRequestUpdate):
+    id: int
+
+class MaintenanceRequestBulkFilter(BaseModel):
+    ids: Optional[List[int]] = None
+    active_only: bool = True
+    equipment_id: Optional[int] = None
+    team_id: Optional[int] = None
+    technician_id: Optional[int] = None
+    stage_id: Optional[int] = None
+    request_type: Optional[str] = None
+
+class MaintenanceRequestBulkUpdate(BaseModel):
+    """Either `items` (one partial update per request) or `filter` plus `patch`"""
+    items: Optional[List[MaintenanceRequestBulkItem]] = None
+    filter: Optional[MaintenanceRequestBulkFilter] = None
+    patch: Optional[MaintenanceRequestUpdate] = None
+
+class BulkItemResult(BaseModel):
+    id: int
+    status: str  # updated, not_found or error
+    error: Optional[str] = None
+
+class BulkUpdateResult(BaseModel):
+    updated: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+# Search Schemas
+class SearchHit(BaseModel):
+    """Search match; snippet is HTML-escaped with matched terms in <mark>"""
+    type: str  # request, equipment
+    id: int
+    name: str
+    snippet: str
+    score: float
+
+
+class SearchResults(BaseModel):
+    query: str
+    hits: List[SearchHit]
+
+
+# Kanban Schemas
+class KanbanCard(BaseModel):
+    """Lightweight request card (no description)"""
+    id: int
+    name: str
+    priority: Optional[str] = None
+    request_type: Optional[str] = None
+    stage_id: Optional[int] = None
+    equipment_id: int
+    equipment_name: Optional[str] = None
+    technician_id: Optional[int] = None
+    technician_name: Optional[str] = None
+    technician_avatar: Optional[str] = None
+    schedule_date: Optional[datetime] = None
+    close_date: Optional[datetime] = None
+    is_overdue: bool = False
+    duration: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+class KanbanCardPage(BaseModel):
+    cards: List[KanbanCard]
+    next_cursor: Optional[str] = None
+
+class KanbanColumn(KanbanCardPage):
+    id: int
+    name: str
+    sequence: Optional[int] = None
+    fold: bool = False
+    done: bool = False
+    is_scrap: bool = False
+    count: int
+
+
+# Calendar Schemas
+class CalendarEvent(BaseModel):
+    """Scheduled maintenance request shown on the calendar"""
+    id: int
+    name: str
+    request_type: Optional[str] = None
+    priority: Optional[str] = None
+    stage_id: Optional[int] = None
+    schedule_date: datetime
+    close_date: Optional[datetime] = None
+    duration: Optional[float] = None
+    equipment_id: int
+    equipment_name: Optional[str] = None
+    maintenance_team_id: Optional[int] = None
+    technician_id: Optional[int] = None
+    technician_name: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Statistics Schemas
 class DashboardStats(BaseModel):
     total_equipment: int
@@ -232,6 +383,38 @@ class DashboardStats(BaseModel):
     open_requests: int
     completed_requests: int
     urgent_requests: int
+    overdue_requests: int = 0
+
+
+# Analytics Schemas
+class ChartCount(BaseModel):
+    name: str
+    count: int
+
+class AnalyticsKPIs(BaseModel):
+    total_requests: int
+    open_requests: int
+    completed_requests: int
+    overdue_requests: int
+
+class MonthlyTrend(BaseModel):
+    month: str
+    total: int
+    preventive: int
+    corrective: int
+
+class PriorityDuration(BaseModel):
+    name: str
+    avg_duration: float
+
+class AnalyticsSummary(BaseModel):
+    kpis: AnalyticsKPIs
+    by_stage: List[ChartCount]
+    by_priority: List[ChartCount]
+    by_type: List[ChartCount]
+    by_team: List[ChartCount]
+    monthly_trend: List[MonthlyTrend]
+    avg_duration_by_priority: List[PriorityDuration]
 
 
 # Update forward references
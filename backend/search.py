@@ -0,0 +1,147 @@
+"""
+Full-text search over maintenance requests and equipment (SQLite FTS5)
+External-content FTS5 tables index the searchable columns and are kept in
+sync by triggers, so every writer (ORM, bulk statements, raw SQL) updates
+them. `python search.py` rebuilds the indexes, e.g. after a bulk load.
+"""
+import html
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+import models
+
+# Delimiters passed to snippet(); replaced by <mark> after HTML-escaping
+MARK_OPEN, MARK_CLOSE = "\x02", "\x03"
+SNIPPET_TOKENS = 12
+MIN_PREFIX_LENGTH = 2
+
+
+@dataclass(frozen=True)
+class FtsIndex:
+    kind: str
+    table: str
+    columns: Tuple[str, ...]
+    weights: Tuple[float, ...]  # bm25 column weights
+
+    @property
+    def fts_table(self) -> str:
+        return f"{self.table}_fts"
+
+    def ddl(self) -> List[str]:
+        """CREATE statements for the FTS table and its sync triggers"""
+        columns = ", ".join(self.columns)
+        new_values = ", ".join(f"new.{column}" for column in self.columns)
+        old_values = ", ".join(f"old.{column}" for column in self.columns)
+        insert = f"INSERT INTO {self.fts_table}(rowid, {columns}) VALUES (new.id, {new_values});"
+        delete = (
+            f"INSERT INTO {self.fts_table}({self.fts_table}, rowid, {columns}) "
+            f"VALUES ('delete', old.id, {old_values});"
+        )
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5("
+            f"{columns}, content='{self.table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.table}_fts_insert AFTER INSERT ON {self.table} "
+            f"BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.table}_fts_delete AFTER DELETE ON {self.table} "
+            f"BEGIN {delete} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.table}_fts_update AFTER UPDATE OF {columns} ON {self.table} "
+            f"BEGIN {delete} {insert} END",
+        ]
+
+
+INDEXES: Dict[str, FtsIndex] = {
+    "request": FtsIndex("request", "maintenance_requests", ("name", "description"), (10.0, 1.0)),
+    "equipment": FtsIndex(
+        "equipment", "equipment", ("name", "serial_no", "model", "location"), (10.0, 8.0, 4.0, 2.0)
+    ),
+}
+
+
+def create_indexes(connection: Connection, rebuild: bool = False):
+    """Create missing FTS tables and triggers; new (or `rebuild`) indexes are filled from their tables"""
+    existing = {
+        name for (name,) in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+    }
+    for index in INDEXES.values():
+        created = index.fts_table not in existing
+        for statement in index.ddl():
+            connection.execute(text(statement))
+        if created or rebuild:
+            connection.execute(text(f"INSERT INTO {index.fts_table}({index.fts_table}) VALUES ('rebuild')"))
+            connection.execute(text(f"INSERT INTO {index.fts_table}({index.fts_table}) VALUES ('optimize')"))
+
+
+@event.listens_for(models.Base.metadata, "after_create")
+def _create_indexes_with_tables(target, connection: Connection, **kw):
+    if connection.dialect.name == "sqlite":
+        create_indexes(connection)
+
+
+def match_expression(query: str) -> str:
+    """FTS5 MATCH expression for user input: every word must match, the last one as a prefix"""
+    words = re.findall(r"\w+", query.lower())
+    terms = [f'"{word}"' for word in words]
+    if words and len(words[-1]) >= MIN_PREFIX_LENGTH:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def clean_snippet(snippet: str) -> str:
+    """HTML-escape a snippet and turn the match delimiters into <mark> tags"""
+    escaped = html.escape(snippet or "")
+    return escaped.replace(MARK_OPEN, "<mark>").replace(MARK_CLOSE, "</mark>")
+
+
+def search_index(db: Session, index: FtsIndex, expression: str, limit: int) -> List[Dict]:
+    """Best `limit` matches in one index, ranked by BM25"""
+    fts = index.fts_table
+    weights = ", ".join(str(weight) for weight in index.weights)
+    # Rank on the index alone, then read names and build snippets for the top rows only
+    rows = db.execute(
+        text(
+            f"WITH top AS (SELECT rowid AS id, bm25({fts}, {weights}) AS score FROM {fts} "
+            f"WHERE {fts} MATCH :expression ORDER BY score LIMIT :limit) "
+            f"SELECT top.id AS id, t.name AS name, top.score AS score, "
+            f"snippet({fts}, -1, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet "
+            f"FROM top JOIN {fts} ON {fts}.rowid = top.id JOIN {index.table} AS t ON t.id = top.id "
+            f"WHERE {fts} MATCH :expression ORDER BY top.score"
+        ),
+        {"expression": expression, "open": MARK_OPEN, "close": MARK_CLOSE, "limit": limit},
+    )
+    return [
+        {
+            "type": index.kind,
+            "id": row.id,
+            "name": row.name,
+            "snippet": clean_snippet(row.snippet),
+            # bm25() is lower-is-better; report higher-is-better
+            "score": -row.score,
+        }
+        for row in rows
+    ]
+
+
+def search(db: Session, query: str, kinds: List[str], limit: int) -> List[Dict]:
+    """Matches across `kinds`, best first"""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    hits = []
+    for kind in kinds:
+        hits.extend(search_index(db, INDEXES[kind], expression, limit))
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    return hits[:limit]
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        create_indexes(connection, rebuild=True)
+    for index in INDEXES.values():
+        print(f"✅ Rebuilt {index.fts_table}")
@@ -0,0 +1,85 @@
+"""Application settings, read from the environment or backend/.env"""
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    database_url: str = "sqlite:///./gearguard.db"
+    # Serve endpoints as async def handlers on an AsyncEngine instead of the threadpool
+    database_async: bool = False
+
+    # Connection pool (per worker process)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30  # seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # seconds; ignored for SQLite
+
+    # Seconds between checks for stage changes made by other workers
+    stage_cache_check_interval: float = 1.0
+
+    # Authentication caches (entries, seconds), and seconds between checks for
+    # user changes made by other workers
+    auth_user_cache_size: int = 1024
+    auth_user_cache_ttl: float = 60.0
+    auth_user_cache_check_interval: float = 1.0
+    auth_token_cache_size: int = 4096
+    auth_token_cache_ttl: float = 300.0
+
+    # Password hashing: bcrypt cost, worker processes (0 = hash inline) and extra queued requests.
+    # Outside async mode each queued sign-in also holds a threadpool thread while it
+    # waits, so at most this share of the threadpool may wait on hashes
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_queue_limit: int = 32
+    password_hash_thread_share: float = 0.25
+
+    # SQLite tuning, applied to every new connection
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 268435456
+    sqlite_temp_store: str = "MEMORY"
+    sqlite_busy_timeout_ms: int = 5000
+
+    # Response pipeline: orjson + TypeAdapter list rendering (needs orjson), and
+    # compression of bodies of at least compression_minimum_size bytes (0 = off).
+    # Brotli is used for clients that accept it when the brotli package is installed.
+    fast_json: bool = False
+    compression_minimum_size: int = 1000
+    gzip_level: int = 6
+    brotli_quality: int = 4
+
+    # Live change events: "local" (single worker) or "sqlite" (shared change_events
+    # table polled by every worker), per-subscriber queue size, seconds between
+    # polls / keep-alive comments, and how long published events are kept
+    events_backend: str = "local"
+    events_queue_size: int = 256
+    events_poll_interval: float = 0.5
+    events_keepalive: float = 15.0
+    events_retention: float = 3600.0
+
+    # Seconds between sweeps that flag requests whose schedule date has passed (0 = off)
+    overdue_sweep_interval: float = 60.0
+
+    # Days ahead that preventive requests are generated for (preventive.py)
+    preventive_horizon_days: int = 90
+
+    # Background jobs: worker threads per API process (0 = none, jobs wait for
+    # another process), seconds between polls for jobs enqueued elsewhere, how
+    # long a claimed job may run before another worker takes it over, and how
+    # long finished jobs are kept
+    jobs_workers: int = 2
+    jobs_poll_interval: float = 1.0
+    jobs_lease: float = 900.0
+    jobs_retention: float = 86400.0
+
+    # Prometheus metrics on GET /metrics (request latency, SQL and pool timings);
+    # scrapers must send the token as a bearer token. Without a token the
+    # endpoint is refused unless metrics_public opens it to everyone
+    metrics_enabled: bool = True
+    metrics_token: str = ""
+    metrics_public: bool = False
+
+
+settings = Settings()
@@ -0,0 +1,101 @@
+"""
+In-process stage registry
+Stages almost never change, so hot paths read them from memory. Local writes
+invalidate immediately; other workers notice through the "stages" version
+counter, checked at most every `check_interval` seconds.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import models
+import versions
+from settings import settings
+
+VERSION_NAME = "stages"
+
+
+@dataclass(frozen=True)
+class CachedStage:
+    id: int
+    name: str
+    sequence: Optional[int]
+    fold: bool
+    done: bool
+    is_scrap: bool
+    description: Optional[str]
+
+
+@dataclass(frozen=True)
+class StageSnapshot:
+    version: int
+    stages: Tuple[CachedStage, ...]  # ordered by sequence
+    by_id: Dict[int, CachedStage]
+    done_ids: FrozenSet[int]
+    scrap_ids: FrozenSet[int]
+
+
+class StageRegistry:
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._snapshot: Optional[StageSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> StageSnapshot:
+        """Current stages, reloading only when the shared version has moved"""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+
+        version = versions.get(db, VERSION_NAME)
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self._load(db, version)
+                    self._snapshot = snapshot
+        self._checked_at = now
+        return snapshot
+
+    def invalidate(self):
+        """Drop the snapshot so the next read reloads it"""
+        self._snapshot = None
+
+    @staticmethod
+    def _load(db: Session, version: int) -> StageSnapshot:
+        stages = tuple(
+            CachedStage(
+                id=stage.id,
+                name=stage.name,
+                sequence=stage.sequence,
+                fold=bool(stage.fold),
+                done=bool(stage.done),
+                is_scrap=bool(stage.is_scrap),
+                description=stage.description,
+            )
+            for stage in db.query(models.Stage).order_by(models.Stage.sequence).all()
+        )
+        return StageSnapshot(
+            version=version,
+            stages=stages,
+            by_id={stage.id: stage for stage in stages},
+            done_ids=frozenset(stage.id for stage in stages if stage.done),
+            scrap_ids=frozenset(stage.id for stage in stages if stage.is_scrap),
+        )
+
+
+registry = StageRegistry(settings.stage_cache_check_interval)
+
+
+def get(db: Session) -> StageSnapshot:
+    return registry.get(db)
+
+
+def changed(db: Session):
+    """Record a stage write in the caller's transaction; this worker's copy is dropped on commit"""
+    versions.bump(db, VERSION_NAME)
+    event.listen(db, "after_commit", lambda session: registry.invalidate(), once=True)
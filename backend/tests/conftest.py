@@ -0,0 +1,55 @@
+"""
+Shared fixtures: the API runs on a throwaway SQLite database
+
+    cd backend && python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_DIR = tempfile.mkdtemp(prefix="gearguard-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'test.db')}"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+import init_data
+import main
+from database import SessionLocal, engine
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Client for the app, with the default stages and users created"""
+    init_data.init_database()
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def count_statements():
+    """count_statements(call) -> SQL statements the engine ran during call()"""
+    def count(call):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            call()
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        return len(statements)
+    return count
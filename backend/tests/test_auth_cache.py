@@ -0,0 +1,58 @@
+"""
+Cached principals follow committed user changes, from this worker at once and
+from other workers through the "users" version; inactive users are rejected.
+"""
+from sqlalchemy import text
+import auth
+import models
+import versions
+from database import engine
+
+
+def add_user(db, email: str) -> models.User:
+    user = models.User(name="Cached user", email=email, password_hash="x", is_active=True)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def headers_for(user: models.User) -> dict:
+    return {"Authorization": f"Bearer {auth.create_access_token(data={'sub': str(user.id)})}"}
+
+
+def test_deactivated_user_is_rejected(client, db):
+    user = add_user(db, "deactivated@example.com")
+    headers = headers_for(user)
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    user.is_active = False
+    db.commit()
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+
+
+def test_rolled_back_change_keeps_cached_principal(client, db, count_statements, monkeypatch):
+    user = add_user(db, "rolled-back@example.com")
+    headers = headers_for(user)
+    monkeypatch.setattr(auth.users_version, "check_interval", 3600)
+    client.get("/api/auth/me", headers=headers)
+
+    user.name = "Never saved"
+    db.flush()
+    db.rollback()
+    assert count_statements(lambda: client.get("/api/auth/me", headers=headers)) == 0
+
+
+def test_change_from_another_worker_is_seen_after_the_check_interval(client, db, monkeypatch):
+    user = add_user(db, "other-worker@example.com")
+    headers = headers_for(user)
+    monkeypatch.setattr(auth.users_version, "check_interval", 3600)
+    client.get("/api/auth/me", headers=headers)
+
+    # Another worker's ORM flush: the row and the "users" version change together
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE users SET name = 'Renamed' WHERE id = :id"), {"id": user.id})
+        versions._bump(conn.execute, auth.USERS_VERSION)
+    assert client.get("/api/auth/me", headers=headers).json()["name"] == "Cached user"
+
+    monkeypatch.setattr(auth.users_version, "check_interval", 0)
+    assert client.get("/api/auth/me", headers=headers).json()["name"] == "Renamed"
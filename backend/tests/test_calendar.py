@@ -0,0 +1,41 @@
+"""
+The calendar page asks for whole days (`yyyy-MM-dd`) and shows every request
+whose scheduled time overlaps them.
+"""
+from datetime import date, datetime, timedelta
+import models
+
+
+def add_request(db, equipment, name: str, schedule_date: datetime, duration: float = 0) -> int:
+    request = models.MaintenanceRequest(
+        name=name, request_type="preventive", equipment=equipment, schedule_date=schedule_date, duration=duration
+    )
+    db.add(request)
+    db.commit()
+    return request.id
+
+
+def test_calendar_accepts_dates_and_includes_overlapping_requests(client, db):
+    day = date(2031, 3, 10)
+    midnight = datetime(day.year, day.month, day.day)
+    equipment = models.Equipment(name="Calendar press", serial_no="SN-CALENDAR")
+    running = add_request(db, equipment, "Overnight overhaul", midnight - timedelta(hours=2), duration=5)
+    inside = add_request(db, equipment, "Inspection", midnight + timedelta(days=1, hours=9))
+    finished = add_request(db, equipment, "Early check", midnight - timedelta(hours=3), duration=2)
+    after = add_request(db, equipment, "Next week", midnight + timedelta(days=7))
+
+    response = client.get("/api/calendar", params={
+        "start": day.strftime("%Y-%m-%d"),
+        "end": (day + timedelta(days=1)).strftime("%Y-%m-%d"),
+        "request_type": "preventive",
+    })
+
+    assert response.status_code == 200
+    ids = {event["id"] for event in response.json()}
+    assert {running, inside} <= ids
+    assert not {finished, after} & ids
+
+
+def test_calendar_rejects_end_before_start(client):
+    response = client.get("/api/calendar", params={"start": "2031-03-10", "end": "2031-03-09"})
+    assert response.status_code == 400
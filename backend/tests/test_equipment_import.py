@@ -0,0 +1,38 @@
+"""
+A batch that fails to insert is retried row by row: only the offending rows
+are reported, and their serial numbers stay free for later rows.
+"""
+import equipment_import
+import models
+from database import SessionLocal
+
+
+def test_failed_batch_is_retried_row_by_row(client, db):
+    body = "\n".join([
+        "name,serial_no",
+        "Import lathe,SN-IMPORT-1",
+        "Import drill,SN-IMPORT-TAKEN",
+        "Import saw,SN-IMPORT-2",
+        "Import drill again,SN-IMPORT-TAKEN",
+        "Import mill,SN-IMPORT-3",
+    ]).encode()
+    chunks = [body]
+
+    def next_chunk():
+        if not chunks:
+            return None
+        # Another client takes a serial number after the import loaded the known ones
+        with SessionLocal() as other:
+            other.add(models.Equipment(name="Taken", serial_no="SN-IMPORT-TAKEN"))
+            other.commit()
+        return chunks.pop()
+
+    report = equipment_import.import_equipment(db, next_chunk, "csv", batch_size=3)
+
+    assert (report["inserted"], report["failed"]) == (3, 2)
+    assert [error["row"] for error in report["errors"]] == [2, 4]
+    assert "IntegrityError" in report["errors"][0]["error"]
+    serials = {serial for (serial,) in db.query(models.Equipment.serial_no).filter(
+        models.Equipment.serial_no.like("SN-IMPORT-%")
+    )}
+    assert serials == {"SN-IMPORT-1", "SN-IMPORT-2", "SN-IMPORT-3", "SN-IMPORT-TAKEN"}
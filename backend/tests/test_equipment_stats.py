@@ -0,0 +1,26 @@
+"""
+Per-equipment statistics count a request as open unless its stage is done;
+requests without a stage are open.
+"""
+import models
+
+
+def test_requests_without_a_stage_count_as_open(client, db):
+    stages = db.query(models.Stage).order_by(models.Stage.sequence).all()
+    done = next(stage for stage in stages if stage.done)
+    working = next(stage for stage in stages if not stage.done)
+    equipment = models.Equipment(name="Stats press", serial_no="SN-STATS")
+    db.add_all([
+        models.MaintenanceRequest(name="No stage yet", equipment=equipment, stage_id=None),
+        models.MaintenanceRequest(name="In progress", equipment=equipment, stage_id=working.id),
+        models.MaintenanceRequest(name="Repaired", equipment=equipment, stage_id=done.id),
+    ])
+    db.commit()
+
+    response = client.get(f"/api/equipment/{equipment.id}/requests/count")
+    assert response.status_code == 200
+    assert response.json() == {"count": 2}
+
+    listed = client.get("/api/equipment", params={"include": "stats", "limit": 1000}).json()
+    stats = next(item for item in listed if item["id"] == equipment.id)
+    assert (stats["maintenance_count"], stats["maintenance_open_count"]) == (3, 2)
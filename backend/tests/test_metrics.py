@@ -0,0 +1,23 @@
+"""
+/metrics needs the configured bearer token, and is refused when no token is
+set unless it was made public on purpose.
+"""
+import pytest
+from settings import settings
+
+
+@pytest.mark.parametrize("token, public, headers, status_code", [
+    ("", False, {}, 403),
+    ("", True, {}, 200),
+    ("secret", False, {}, 401),
+    ("secret", False, {"Authorization": "Bearer wrong"}, 401),
+    ("secret", False, {"Authorization": "Bearer secret"}, 200),
+    ("secret", True, {}, 401),
+])
+def test_metrics_access(client, monkeypatch, token, public, headers, status_code):
+    monkeypatch.setattr(settings, "metrics_token", token)
+    monkeypatch.setattr(settings, "metrics_public", public)
+    response = client.get("/metrics", headers=headers)
+    assert response.status_code == status_code
+    if status_code == 200:
+        assert "text/plain" in response.headers["content-type"]
@@ -0,0 +1,32 @@
+"""
+Cursors whose values the sort columns could not hold are rejected with 400,
+and pages keep NULL sort keys in the same place on every database.
+"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+import models
+from pagination import _order_by, encode_cursor
+
+
+@pytest.mark.parametrize("values", [[{"a": 1}, 1], ["2", "x"], ["2", True], [["2"], 1], ["2", None]])
+def test_cursor_values_of_the_wrong_type_are_rejected(client, values):
+    response = client.get("/api/requests", params={"cursor": encode_cursor(values)})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_cursor_with_null_priority_is_accepted(client):
+    assert client.get("/api/requests", params={"cursor": encode_cursor([None, 1])}).status_code == 200
+
+
+def test_nullable_sort_keys_order_nulls_lowest():
+    priority, request_id = models.MaintenanceRequest.priority, models.MaintenanceRequest.id
+    statement = select(request_id).order_by(_order_by(priority, True), _order_by(request_id, False))
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.endswith("ORDER BY maintenance_requests.priority DESC NULLS LAST, maintenance_requests.id ASC")
+
+
+def test_next_cursor_header_is_exposed_to_the_frontend(client):
+    response = client.get("/api/requests", params={"limit": 1}, headers={"Origin": "http://localhost:3000"})
+    assert response.headers["access-control-expose-headers"] == "X-Next-Cursor"
@@ -0,0 +1,60 @@
+"""
+The list and kanban endpoints load relationships eagerly, so the number of SQL
+statements they run does not depend on how many rows they return.
+"""
+import itertools
+import pytest
+from sqlalchemy import insert
+import models
+import stage_cache
+
+ENDPOINTS = (
+    "/api/teams",
+    "/api/equipment",
+    "/api/requests",
+    "/api/kanban",
+    "/api/kanban/{stage_id}",
+)
+_batches = itertools.count()
+
+
+def add_rows(db, count: int):
+    """`count` teams with a leader and two members, each with equipment and requests in every stage"""
+    batch = next(_batches)
+    stage_ids = [stage_id for (stage_id,) in db.query(models.Stage.id).order_by(models.Stage.sequence)]
+    for i in range(count):
+        users = [
+            models.User(name=f"Technician {batch}-{i}-{n}", email=f"tech{batch}-{i}-{n}@example.com", password_hash="x")
+            for n in range(3)
+        ]
+        team = models.Team(name=f"Team {batch}-{i}", leader=users[0], members=users)
+        equipment = models.Equipment(
+            name=f"Machine {batch}-{i}", serial_no=f"SN-{batch}-{i}", maintenance_team=team, technician=users[1]
+        )
+        db.add_all([team, equipment])
+        db.flush()
+        db.execute(insert(models.MaintenanceRequest), [
+            {
+                "name": f"Request {batch}-{i}-{stage_id}", "priority": str(i % 4), "stage_id": stage_id,
+                "equipment_id": equipment.id, "maintenance_team_id": team.id, "technician_id": users[2].id,
+            }
+            for stage_id in stage_ids
+        ])
+    db.commit()
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_statements_do_not_grow_with_rows(client, db, count_statements, monkeypatch, endpoint):
+    # Keep the stage cache's periodic version check out of the counts
+    monkeypatch.setattr(stage_cache.registry, "check_interval", 3600)
+    url = endpoint.format(stage_id=db.query(models.Stage.id).order_by(models.Stage.sequence).limit(1).scalar())
+
+    def statements():
+        assert client.get(url).status_code == 200  # warms the stage cache and version reads
+        return count_statements(lambda: client.get(url))
+
+    add_rows(db, 2)
+    few = statements()
+    add_rows(db, 15)
+    many = statements()
+    assert many == few
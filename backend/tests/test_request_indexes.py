@@ -0,0 +1,107 @@
+"""
+The SQL each request endpoint runs searches maintenance_requests through the
+index meant for it, even when its filter matches a large share of the rows.
+"""
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete, event, insert, select, text
+import models
+from database import engine
+
+# Endpoint (formatted with the ids of the rows added below) and the indexes its
+# statements on maintenance_requests must search through (a tuple lists alternatives)
+EQUIPMENT_INDEXES = ("ix_maintenance_requests_equipment_priority", "uq_maintenance_requests_equipment_due")
+ENDPOINT_INDEXES = {
+    "request list": ("/api/requests", ("ix_maintenance_requests_active_priority",)),
+    "request list (next page)": ("/api/requests?cursor={cursor}", ("ix_maintenance_requests_active_priority",)),
+    "request list (stage)": ("/api/requests?stage_id={stage_id}", ("ix_maintenance_requests_active_stage_priority",)),
+    "request list (team)": ("/api/requests?team_id={team_id}", ("ix_maintenance_requests_team_priority",)),
+    "request list (equipment)": (
+        "/api/requests?equipment_id={equipment_id}", ("ix_maintenance_requests_equipment_priority",)
+    ),
+    "equipment history": ("/api/equipment/{equipment_id}/requests", (EQUIPMENT_INDEXES,)),
+    "equipment open count": ("/api/equipment/{equipment_id}/requests/count", (EQUIPMENT_INDEXES,)),
+    "equipment list with stats": ("/api/equipment?include=stats", (EQUIPMENT_INDEXES,)),
+    "kanban": ("/api/kanban", ("ix_maintenance_requests_active_stage_priority",)),
+    "kanban column": ("/api/kanban/{stage_id}", ("ix_maintenance_requests_active_stage_priority",)),
+    "calendar": (
+        "/api/calendar?start={start}&end={end}&request_type=preventive",
+        ("ix_maintenance_requests_schedule", "ix_maintenance_requests_duration"),
+    ),
+    "calendar feed": (
+        "/api/calendar/feed.ics?team_id={team_id}&start={start}T00:00:00", ("ix_maintenance_requests_team_priority",)
+    ),
+}
+ROWS = 5000
+EQUIPMENT = 50
+NAME_PREFIX = "Indexed request"
+SERIAL_PREFIX = "SN-INDEXED"
+
+
+def query_plan(conn, statement: str, parameters) -> list:
+    """EXPLAIN QUERY PLAN detail lines"""
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+@pytest.fixture(scope="module")
+def ids(client):
+    """Adds many requests over two teams, and removes them (and the planner statistics) afterwards"""
+    now = datetime.now()
+    with engine.begin() as conn:
+        team_ids = list(conn.execute(select(models.Team.id).order_by(models.Team.id).limit(2)).scalars())
+        stage_ids = list(conn.execute(select(models.Stage.id).order_by(models.Stage.sequence)).scalars())
+        equipment_ids = list(conn.execute(
+            insert(models.Equipment).returning(models.Equipment.id),
+            [{"name": f"Indexed machine {i}", "serial_no": f"{SERIAL_PREFIX}-{i}", "maintenance_team_id": team_ids[i % 2]}
+             for i in range(EQUIPMENT)],
+        ).scalars())
+        conn.execute(insert(models.MaintenanceRequest), [
+            {
+                "name": f"{NAME_PREFIX} {i}", "priority": str(i % 4), "active": i % 10 != 0,
+                "request_type": "preventive" if i % 3 else "corrective", "stage_id": stage_ids[i % len(stage_ids)],
+                "equipment_id": equipment_ids[i % EQUIPMENT], "maintenance_team_id": team_ids[i % 2],
+                "schedule_date": now + timedelta(hours=i - ROWS // 2), "duration": i % 8,
+                "close_date": now if i % 5 == 0 else None,
+            }
+            for i in range(ROWS)
+        ])
+        conn.execute(text("ANALYZE"))
+    try:
+        yield {
+            "team_id": team_ids[0], "stage_id": stage_ids[0], "equipment_id": equipment_ids[0],
+            "start": date.today().isoformat(), "end": (date.today() + timedelta(days=7)).isoformat(),
+        }
+    finally:
+        with engine.begin() as conn:
+            conn.execute(delete(models.MaintenanceRequest).where(models.MaintenanceRequest.name.startswith(NAME_PREFIX)))
+            conn.execute(delete(models.Equipment).where(models.Equipment.serial_no.startswith(SERIAL_PREFIX)))
+            # Planner statistics for 5000 extra rows would steer the other tests' queries
+            conn.execute(text("DROP TABLE sqlite_stat1"))
+
+
+@pytest.mark.parametrize("label", ENDPOINT_INDEXES)
+def test_endpoint_queries_use_their_indexes(client, ids, label):
+    url, index_names = ENDPOINT_INDEXES[label]
+    cursor = client.get("/api/requests?limit=20").headers.get("X-Next-Cursor")
+    url = url.format(cursor=cursor, **ids)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM maintenance_requests" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert statements
+    with engine.connect() as conn:
+        plans = [query_plan(conn, statement, parameters) for statement, parameters in statements]
+    details = [detail for plan in plans for detail in plan]
+    assert not [detail for detail in details if detail.startswith("SCAN maintenance_requests")], plans
+    for names in index_names:
+        names = (names,) if isinstance(names, str) else names
+        assert any(f"INDEX {name} " in f"{detail} " for detail in details for name in names), plans
@@ -0,0 +1,79 @@
+"""
+Change counters shared by all workers
+Writers bump a named counter in the same transaction as their change;
+readers compare it with the value their cache was built from. Every ORM
+flush and ORM-enabled INSERT/UPDATE/DELETE also bumps the counter named
+after each table it touched.
+"""
+import random
+from itertools import chain
+from typing import Callable, Dict, Iterable
+from sqlalchemy import event, inspect, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import ORMExecuteState, Session
+import models
+
+# Bookkeeping tables whose writes are not worth a version bump
+UNTRACKED_TABLES = {"counters", "cache_versions", "change_events", "jobs"}
+
+
+def _bump(execute: Callable, name: str):
+    table = models.CacheVersion.__table__
+    result = execute(
+        update(table)
+        .where(table.c.name == name)
+        .values(version=table.c.version + 1)
+    )
+    if result.rowcount == 0:
+        execute(insert(table).values(name=name, version=1))
+
+
+def get(db: Session, name: str) -> int:
+    """Current version of `name` (0 if it was never bumped)"""
+    version = db.query(models.CacheVersion.version).filter(models.CacheVersion.name == name).scalar()
+    return version or 0
+
+
+def get_many(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """Versions of the given names that exist, in one query"""
+    return dict(
+        db.query(models.CacheVersion.name, models.CacheVersion.version)
+        .filter(models.CacheVersion.name.in_(list(names)))
+        .all()
+    )
+
+
+def bump(db: Session, name: str):
+    """Increment `name` inside the caller's transaction"""
+    _bump(db.execute, name)
+
+
+def ensure_random(db: Session, name: str) -> int:
+    """Value of `name`, created with a random value (and committed) if missing"""
+    try:
+        db.add(models.CacheVersion(name=name, version=random.randrange(1, 2 ** 31)))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    return get(db, name)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed_tables(session: Session, flush_context):
+    changed = chain(
+        session.new,
+        session.deleted,
+        (obj for obj in session.dirty if session.is_modified(obj)),
+    )
+    tables = {inspect(obj).mapper.local_table.name for obj in changed}
+    for name in sorted(tables - UNTRACKED_TABLES):
+        _bump(session.connection().execute, name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_statement_table(state: ORMExecuteState):
+    if not (state.is_insert or state.is_update or state.is_delete) or state.bind_mapper is None:
+        return
+    name = state.bind_mapper.local_table.name
+    if name not in UNTRACKED_TABLES:
+        _bump(state.session.connection().execute, name)
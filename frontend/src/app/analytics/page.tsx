@@ -1,130 +1,40 @@
 'use client'
 
-import { useMemo } from 'react'
 import { useQuery } from '@tanstack/react-query'
 import { BarChart, Bar, PieChart, Pie, LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, Cell } from 'recharts'
 import { Wrench, ArrowLeft, TrendingUp, AlertCircle, Clock, CheckCircle } from 'lucide-react'
 import { api } from '@/lib/api'
+import { useRefetchOnChange } from '@/lib/events'
 import Link from 'next/link'
 
 const COLORS = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#ec4899']
 
 export default function AnalyticsPage() {
-  // Fetch all data
-  const { data: requests = [] } = useQuery({
-    queryKey: ['requests'],
-    queryFn: () => api.getRequests(),
+  // Breakdowns are aggregated server-side so the page never downloads whole tables
+  const { data: summary } = useQuery({
+    queryKey: ['analytics-summary'],
+    queryFn: () => api.getAnalyticsSummary(),
   })
-
-  const { data: stages = [] } = useQuery({
-    queryKey: ['stages'],
-    queryFn: () => api.getStages(),
-  })
-
-  const { data: teams = [] } = useQuery({
-    queryKey: ['teams'],
-    queryFn: () => api.getTeams(),
-  })
-
-  const { data: equipment = [] } = useQuery({
-    queryKey: ['equipment'],
-    queryFn: () => api.getEquipment(false),
-  })
-
-  // Calculate analytics
-  const analytics = useMemo(() => {
-    // Requests by stage
-    const byStage = stages.map((stage: any) => ({
-      name: stage.name,
-      count: requests.filter((r: any) => r.stage_id === stage.id).length,
-    }))
-
-    // Requests by priority
-    const priorityMap: Record<string, string> = {
-      '0': 'Low',
-      '1': 'Medium',
-      '2': 'High',
-      '3': 'Urgent',
-    }
-    const byPriority = Object.entries(priorityMap).map(([key, label]) => ({
-      name: label,
-      count: requests.filter((r: any) => r.priority === key).length,
-    }))
-
-    // Requests by type
-    const byType = [
-      { name: 'Preventive', count: requests.filter((r: any) => r.request_type === 'preventive').length },
-      { name: 'Corrective', count: requests.filter((r: any) => r.request_type === 'corrective').length },
-    ]
-
-    // Requests by team
-    const byTeam = teams.map((team: any) => ({
-      name: team.name,
-      count: requests.filter((r: any) => r.maintenance_team_id === team.id).length,
-    }))
-
-    // Monthly trend (last 6 months)
-    const monthlyTrend = []
-    for (let i = 5; i >= 0; i--) {
-      const date = new Date()
-      date.setMonth(date.getMonth() - i)
-      const monthName = date.toLocaleDateString('en-US', { month: 'short', year: 'numeric' })
-      
-      const monthRequests = requests.filter((r: any) => {
-        const createdDate = new Date(r.created_at)
-        return createdDate.getMonth() === date.getMonth() && createdDate.getFullYear() === date.getFullYear()
-      })
-
-      monthlyTrend.push({
-        month: monthName,
-        total: monthRequests.length,
-        preventive: monthRequests.filter((r: any) => r.request_type === 'preventive').length,
-        corrective: monthRequests.filter((r: any) => r.request_type === 'corrective').length,
-      })
-    }
-
-    // Average duration by priority
-    const avgDurationByPriority = Object.entries(priorityMap).map(([key, label]) => {
-      const priorityRequests = requests.filter((r: any) => r.priority === key && r.duration)
-      const avgDuration = priorityRequests.length > 0
-        ? priorityRequests.reduce((sum: number, r: any) => sum + (r.duration || 0), 0) / priorityRequests.length
-        : 0
-      return {
-        name: label,
-        avgDuration: Math.round(avgDuration * 10) / 10,
-      }
-    })
-
-    // KPIs
-    const totalRequests = requests.length
-    const openRequests = requests.filter((r: any) => {
-      const stage = stages.find((s: any) => s.id === r.stage_id)
-      return stage && !stage.done
-    }).length
-    const completedRequests = requests.filter((r: any) => {
-      const stage = stages.find((s: any) => s.id === r.stage_id)
-      return stage && stage.done
-    }).length
-    const overdueRequests = requests.filter((r: any) => {
-      if (!r.schedule_date || r.close_date) return false
-      return new Date(r.schedule_date) < new Date()
-    }).length
-
-    return {
-      byStage,
-      byPriority,
-      byType,
-      byTeam,
-      monthlyTrend,
-      avgDurationByPriority,
-      kpis: {
-        totalRequests,
-        openRequests,
-        completedRequests,
-        overdueRequests,
-      },
-    }
-  }, [requests, stages, teams])
+  // The summary is an aggregate query, so changes refresh it at most every 30 seconds
+  useRefetchOnChange(['analytics-summary'], 30000)
+
+  const analytics = {
+    byStage: summary?.by_stage ?? [],
+    byPriority: summary?.by_priority ?? [],
+    byType: summary?.by_type ?? [],
+    byTeam: summary?.by_team ?? [],
+    monthlyTrend: summary?.monthly_trend ?? [],
+    avgDurationByPriority: (summary?.avg_duration_by_priority ?? []).map((d: any) => ({
+      name: d.name,
+      avgDuration: d.avg_duration,
+    })),
+    kpis: {
+      totalRequests: summary?.kpis.total_requests ?? 0,
+      openRequests: summary?.kpis.open_requests ?? 0,
+      completedRequests: summary?.kpis.completed_requests ?? 0,
+      overdueRequests: summary?.kpis.overdue_requests ?? 0,
+    },
+  }
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-blue-50 to-indigo-100">
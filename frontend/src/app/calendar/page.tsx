@@ -3,7 +3,7 @@
 import { useState, useMemo, useCallback } from 'react'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import { Calendar as BigCalendar, dateFnsLocalizer, View } from 'react-big-calendar'
-import { format, parse, startOfWeek, getDay } from 'date-fns'
+import { format, parse, startOfWeek, endOfWeek, startOfMonth, endOfMonth, addDays, getDay } from 'date-fns'
 import { enUS } from 'date-fns/locale'
 import { Wrench, ArrowLeft, Plus } from 'lucide-react'
 import { api } from '@/lib/api'
@@ -28,10 +28,14 @@ export default function CalendarPage() {
   const [date, setDate] = useState(new Date())
   const [selectedEvent, setSelectedEvent] = useState<any>(null)
 
+  // Only fetch the visible window (month grid, plus a month ahead for the agenda view)
+  const rangeStart = startOfWeek(startOfMonth(date))
+  const rangeEnd = addDays(endOfWeek(endOfMonth(date)), view === 'agenda' ? 31 : 1)
+
   // Fetch preventive maintenance requests
   const { data: requests = [] } = useQuery({
-    queryKey: ['requests', 'preventive'],
-    queryFn: () => api.getRequests({ request_type: 'preventive' }),
+    queryKey: ['calendar', 'preventive', rangeStart.toISOString(), rangeEnd.toISOString()],
+    queryFn: () => api.getCalendar(format(rangeStart, 'yyyy-MM-dd'), format(rangeEnd, 'yyyy-MM-dd'), { request_type: 'preventive' }),
   })
 
   // Fetch teams for color coding
@@ -43,7 +47,6 @@ export default function CalendarPage() {
   // Convert requests to calendar events
   const events = useMemo(() => {
     return requests
-      .filter((r: any) => r.schedule_date)
       .map((r: any) => {
         const team = teams.find((t: any) => t.id === r.maintenance_team_id)
         return {
@@ -192,6 +192,25 @@ export default function EquipmentDetailPage() {
               </div>
             )}
 
+            {/* Preventive Schedule */}
+            {equipment.maintenance_interval && (
+              <div className="bg-white rounded-lg shadow-lg p-6">
+                <div className="flex items-center space-x-2 mb-2">
+                  <Calendar className="h-5 w-5 text-gray-600" />
+                  <h3 className="font-semibold text-gray-900">Preventive Schedule</h3>
+                </div>
+                <p className="text-sm text-gray-600">
+                  Every {equipment.maintenance_interval} {equipment.maintenance_interval_unit}
+                  {equipment.maintenance_interval_unit === 'hours' && ` (${equipment.usage_hours_per_day} h/day)`}
+                </p>
+                {equipment.next_preventive_date && (
+                  <p className="text-sm text-gray-600">
+                    Next: {new Date(equipment.next_preventive_date).toLocaleDateString()}
+                  </p>
+                )}
+              </div>
+            )}
+
             {/* Technician Info */}
             {equipment.technician_id && (
               <div className="bg-white rounded-lg shadow-lg p-6">
@@ -11,16 +11,29 @@ export default function EquipmentPage() {
 
   // Fetch equipment
   const { data: equipment = [], isLoading } = useQuery({
-    queryKey: ['equipment'],
-    queryFn: () => api.getEquipment(true),
+    queryKey: ['equipment', 'stats'],
+    queryFn: () => api.getEquipment(true, 'stats'),
+  })
+
+  // Longer terms are searched on the server, which also finds equipment past the loaded page
+  const term = searchTerm.trim()
+  const { data: searchResults } = useQuery({
+    queryKey: ['equipment-search', term],
+    queryFn: () => api.search(term, 'equipment', 100),
+    enabled: term.length >= 2,
+    placeholderData: (previous) => previous,
   })
 
   // Filter equipment by search term
-  const filteredEquipment = equipment.filter((eq: any) =>
-    eq.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    eq.serial_no?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    eq.model?.toLowerCase().includes(searchTerm.toLowerCase())
-  )
+  const filteredEquipment = term.length >= 2 && searchResults
+    ? searchResults.hits.map((hit: any) =>
+        equipment.find((eq: any) => eq.id === hit.id) ?? { id: hit.id, name: hit.name }
+      )
+    : equipment.filter((eq: any) =>
+        eq.name.toLowerCase().includes(term.toLowerCase()) ||
+        eq.serial_no?.toLowerCase().includes(term.toLowerCase()) ||
+        eq.model?.toLowerCase().includes(term.toLowerCase())
+      )
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-blue-50 to-indigo-100">
@@ -56,7 +69,7 @@ export default function EquipmentPage() {
             <Search className="absolute left-3 top-1/2 transform -translate-y-1/2 h-5 w-5 text-gray-400" />
             <input
               type="text"
-              placeholder="Search equipment by name, serial number, or model..."
+              placeholder="Search equipment by name, serial number, model, or location..."
               value={searchTerm}
               onChange={(e) => setSearchTerm(e.target.value)}
               className="w-full pl-10 pr-4 py-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent"
@@ -114,6 +127,19 @@ export default function EquipmentPage() {
                   )}
                 </div>
 
+                {eq.maintenance_count > 0 && (
+                  <div className="mt-4 flex flex-wrap gap-2">
+                    <span className="inline-flex items-center px-2 py-1 rounded-full text-xs font-medium bg-blue-100 text-blue-700">
+                      {eq.maintenance_open_count} open / {eq.maintenance_count} requests
+                    </span>
+                    {eq.next_maintenance_date && (
+                      <span className="inline-flex items-center px-2 py-1 rounded-full text-xs font-medium bg-gray-100 text-gray-700">
+                        Next: {new Date(eq.next_maintenance_date).toLocaleDateString()}
+                      </span>
+                    )}
+                  </div>
+                )}
+
                 {eq.is_scrap && (
                   <div className="mt-4 pt-4 border-t border-gray-200">
                     <span className="inline-flex items-center px-2 py-1 rounded-full text-xs font-medium bg-red-100 text-red-700">
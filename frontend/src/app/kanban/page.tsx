@@ -1,11 +1,12 @@
 'use client'
 
-import { useState } from 'react'
+import { useEffect, useState } from 'react'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import { DndContext, DragEndEvent, DragOverlay, DragStartEvent, PointerSensor, useSensor, useSensors } from '@dnd-kit/core'
 import { SortableContext, verticalListSortingStrategy } from '@dnd-kit/sortable'
 import { Wrench, Plus, User, AlertCircle, Clock, ArrowLeft } from 'lucide-react'
 import { api } from '@/lib/api'
+import { applyToKanban, useChangeEvents } from '@/lib/events'
 import { useAuth } from '@/lib/auth-context'
 import Link from 'next/link'
 import KanbanColumn from '@/components/KanbanColumn'
@@ -15,23 +16,75 @@ export default function KanbanPage() {
   const { user } = useAuth()
   const queryClient = useQueryClient()
   const [activeId, setActiveId] = useState<string | null>(null)
+  const [expanded, setExpanded] = useState<number[]>([])
+  const [loading, setLoading] = useState<number[]>([])
 
-  // Fetch stages
+  // Fetch the board: stages with their counts and first cards
   const { data: stages = [] } = useQuery({
-    queryKey: ['stages'],
-    queryFn: () => api.getStages(),
+    queryKey: ['kanban'],
+    queryFn: () => api.getKanban(),
   })
 
-  // Fetch maintenance requests
-  const { data: requests = [] } = useQuery({
-    queryKey: ['requests'],
-    queryFn: () => api.getRequests({ active_only: true }),
+  const requests = stages.flatMap((stage: any) => stage.cards)
+
+  // Fetch a column's next page (its first page without a cursor) into the cached board,
+  // so live updates keep patching the loaded cards
+  const loadCards = async (stageId: number, cursor?: string) => {
+    setLoading((ids) => [...ids, stageId])
+    try {
+      const page = await api.getKanbanColumn(stageId, cursor ? { cursor } : undefined)
+      queryClient.setQueryData<any[]>(['kanban'], (board) =>
+        board?.map((stage) => {
+          if (stage.id !== stageId) return stage
+          const cards = cursor ? stage.cards : []
+          const seen = new Set(cards.map((card: any) => card.id))
+          return {
+            ...stage,
+            cards: [...cards, ...page.cards.filter((card: any) => !seen.has(card.id))],
+            next_cursor: page.next_cursor,
+            loaded: true,
+          }
+        })
+      )
+    } finally {
+      setLoading((ids) => ids.filter((id) => id !== stageId))
+    }
+  }
+
+  const toggleFold = (stage: any) => {
+    if (expanded.includes(stage.id)) {
+      setExpanded(expanded.filter((id) => id !== stage.id))
+      return
+    }
+    setExpanded([...expanded, stage.id])
+    if (stage.count > 0) loadCards(stage.id)
+  }
+
+  // A refetched board carries no cards for folded stages: reload the expanded ones
+  useEffect(() => {
+    stages.forEach((stage: any) => {
+      if (stage.fold && !stage.loaded && stage.count > 0 && expanded.includes(stage.id) && !loading.includes(stage.id)) {
+        loadCards(stage.id)
+      }
+    })
+  }, [stages])
+
+  // Live updates: patch moved or edited cards in place, refetch only when that isn't possible
+  useChangeEvents((event) => {
+    const board = queryClient.getQueryData<any[]>(['kanban'])
+    const next = event && board ? applyToKanban(board, event) : null
+    if (next) {
+      queryClient.setQueryData(['kanban'], next)
+    } else {
+      queryClient.invalidateQueries({ queryKey: ['kanban'] })
+    }
   })
 
   // Update request mutation
   const updateRequestMutation = useMutation({
     mutationFn: ({ id, data }: { id: number; data: any }) => api.updateRequest(id, data),
     onSuccess: () => {
+      queryClient.invalidateQueries({ queryKey: ['kanban'] })
       queryClient.invalidateQueries({ queryKey: ['requests'] })
     },
   })
@@ -73,12 +126,6 @@ export default function KanbanPage() {
     setActiveId(null)
   }
 
-  // Group requests by stage
-  const requestsByStage = stages.reduce((acc: any, stage: any) => {
-    acc[stage.id] = requests.filter((r: any) => r.stage_id === stage.id)
-    return acc
-  }, {})
-
   // Find active request for drag overlay
   const activeRequest = activeId ? requests.find((r: any) => r.id === parseInt(activeId)) : null
 
@@ -122,7 +169,12 @@ export default function KanbanPage() {
               <KanbanColumn
                 key={stage.id}
                 stage={stage}
-                requests={requestsByStage[stage.id] || []}
+                requests={stage.cards}
+                count={stage.count}
+                expanded={expanded.includes(stage.id)}
+                onToggleFold={() => toggleFold(stage)}
+                onLoadMore={() => loadCards(stage.id, stage.next_cursor)}
+                loading={loading.includes(stage.id)}
               />
             ))}
           </div>
@@ -6,6 +6,7 @@ import Link from 'next/link'
 import { Wrench, Package, Users, BarChart3, Calendar, Settings, LogOut, User } from 'lucide-react'
 import { api } from '@/lib/api'
 import { useAuth } from '@/lib/auth-context'
+import { useRefetchOnChange } from '@/lib/events'
 
 export default function Home() {
   const { user, logout } = useAuth()
@@ -14,6 +15,7 @@ export default function Home() {
     queryKey: ['dashboard-stats'],
     queryFn: () => api.getDashboardStats(),
   })
+  useRefetchOnChange(['dashboard-stats'], 1000)
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-blue-50 to-indigo-100">
@@ -125,7 +127,7 @@ export default function Home() {
 
         {/* Stats Grid */}
         {stats && (
-          <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6 mb-12">
+          <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-5 gap-6 mb-12">
             <StatCard
               title="Total Equipment"
               value={stats.total_equipment}
@@ -150,6 +152,12 @@ export default function Home() {
               icon={<Wrench className="h-8 w-8" />}
               color="red"
             />
+            <StatCard
+              title="Overdue Requests"
+              value={stats.overdue_requests}
+              icon={<Wrench className="h-8 w-8" />}
+              color="red"
+            />
           </div>
         )}
 
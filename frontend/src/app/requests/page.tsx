@@ -3,6 +3,7 @@
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import { useState } from 'react'
 import { api } from '@/lib/api'
+import { applyToRequests, useChangeEvents } from '@/lib/events'
 import { Plus, ArrowLeft } from 'lucide-react'
 import Link from 'next/link'
 
@@ -15,6 +16,17 @@ export default function RequestsPage() {
     queryFn: () => api.getRequests(),
   })
 
+  // Live updates: patch edited requests in place, refetch only when that isn't possible
+  useChangeEvents((event) => {
+    const cached = queryClient.getQueryData<any[]>(['requests'])
+    const next = event && cached ? applyToRequests(cached, event) : null
+    if (next) {
+      queryClient.setQueryData(['requests'], next)
+    } else {
+      queryClient.invalidateQueries({ queryKey: ['requests'] })
+    }
+  })
+
   const { data: stages, isLoading: stagesLoading } = useQuery({
     queryKey: ['stages'],
     queryFn: () => api.getStages(),
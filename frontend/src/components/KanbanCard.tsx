@@ -25,8 +25,8 @@ export default function KanbanCard({ request }: KanbanCardProps) {
     opacity: isDragging ? 0.5 : 1,
   }
 
-  // Check if request is overdue
-  const isOverdue = request.schedule_date && new Date(request.schedule_date) < new Date() && !request.close_date
+  // Overdue flag is maintained by the server (schedule date passed, stage not done)
+  const isOverdue = request.is_overdue
 
   // Priority colors
   const priorityColors: Record<string, { bg: string; text: string; label: string }> = {
@@ -77,9 +77,9 @@ export default function KanbanCard({ request }: KanbanCardProps) {
           </h4>
 
           {/* Equipment name */}
-          {request.equipment && (
+          {request.equipment_id && (
             <p className="text-sm text-gray-600 mb-3">
-              Equipment: {request.equipment.name || `ID: ${request.equipment_id}`}
+              Equipment: {request.equipment_name || `ID: ${request.equipment_id}`}
             </p>
           )}
 
@@ -104,11 +104,15 @@ export default function KanbanCard({ request }: KanbanCardProps) {
           {/* Assigned technician */}
           {request.technician_id && (
             <div className="flex items-center space-x-2 mt-3 pt-3 border-t border-gray-100">
-              <div className="h-6 w-6 rounded-full bg-blue-600 flex items-center justify-center">
-                <User className="h-4 w-4 text-white" />
-              </div>
+              {request.technician_avatar ? (
+                <img src={request.technician_avatar} alt="" className="h-6 w-6 rounded-full" />
+              ) : (
+                <div className="h-6 w-6 rounded-full bg-blue-600 flex items-center justify-center">
+                  <User className="h-4 w-4 text-white" />
+                </div>
+              )}
               <span className="text-xs text-gray-600">
-                Assigned to technician #{request.technician_id}
+                {request.technician_name || `Assigned to technician #${request.technician_id}`}
               </span>
             </div>
           )}
@@ -2,19 +2,37 @@
 
 import { useDroppable } from '@dnd-kit/core'
 import { SortableContext, verticalListSortingStrategy } from '@dnd-kit/sortable'
+import { ChevronDown, ChevronRight } from 'lucide-react'
 import KanbanCard from './KanbanCard'
 
 interface KanbanColumnProps {
   stage: any
   requests: any[]
+  count?: number
+  // Folded stages show only their count until expanded
+  expanded?: boolean
+  onToggleFold?: () => void
+  // Loads the page after the last loaded card (shown while stage.next_cursor is set)
+  onLoadMore?: () => void
+  loading?: boolean
 }
 
-export default function KanbanColumn({ stage, requests }: KanbanColumnProps) {
+export default function KanbanColumn({
+  stage,
+  requests,
+  count,
+  expanded = false,
+  onToggleFold,
+  onLoadMore,
+  loading = false,
+}: KanbanColumnProps) {
   const { setNodeRef } = useDroppable({
     id: stage.id,
   })
 
   const requestIds = requests.map((r) => r.id.toString())
+  const total = count ?? requests.length
+  const collapsed = stage.fold && !expanded
 
   // Color mapping for stages
   const stageColors: Record<string, string> = {
@@ -37,9 +55,20 @@ export default function KanbanColumn({ stage, requests }: KanbanColumnProps) {
         {/* Column Header */}
         <div className={`${headerColors[stage.name] || 'bg-gray-600'} text-white px-4 py-3 rounded-t-lg`}>
           <div className="flex items-center justify-between">
-            <h3 className="font-semibold text-lg">{stage.name}</h3>
+            <div className="flex items-center space-x-1">
+              {stage.fold && onToggleFold && (
+                <button
+                  onClick={onToggleFold}
+                  className="hover:bg-white/20 rounded"
+                  aria-label={collapsed ? `Expand ${stage.name}` : `Collapse ${stage.name}`}
+                >
+                  {collapsed ? <ChevronRight className="h-5 w-5" /> : <ChevronDown className="h-5 w-5" />}
+                </button>
+              )}
+              <h3 className="font-semibold text-lg">{stage.name}</h3>
+            </div>
             <span className="bg-white/20 px-2 py-1 rounded-full text-sm">
-              {requests.length}
+              {total}
             </span>
           </div>
         </div>
@@ -49,16 +78,39 @@ export default function KanbanColumn({ stage, requests }: KanbanColumnProps) {
           ref={setNodeRef}
           className="p-3 space-y-3 min-h-[200px]"
         >
-          <SortableContext items={requestIds} strategy={verticalListSortingStrategy}>
-            {requests.map((request) => (
-              <KanbanCard key={request.id} request={request} />
-            ))}
-          </SortableContext>
-
-          {requests.length === 0 && (
-            <div className="text-center text-gray-400 py-8">
-              <p className="text-sm">No requests</p>
+          {collapsed ? (
+            <div className="text-center text-gray-500 py-8">
+              <p className="text-sm">{total} {total === 1 ? 'request' : 'requests'} folded</p>
+              {total > 0 && onToggleFold && (
+                <button onClick={onToggleFold} className="mt-2 text-sm text-blue-600 hover:text-blue-800">
+                  Show cards
+                </button>
+              )}
             </div>
+          ) : (
+            <>
+              <SortableContext items={requestIds} strategy={verticalListSortingStrategy}>
+                {requests.map((request) => (
+                  <KanbanCard key={request.id} request={request} />
+                ))}
+              </SortableContext>
+
+              {requests.length === 0 && (
+                <div className="text-center text-gray-400 py-8">
+                  <p className="text-sm">{loading ? 'Loading...' : 'No requests'}</p>
+                </div>
+              )}
+
+              {stage.next_cursor && onLoadMore && (
+                <button
+                  onClick={onLoadMore}
+                  disabled={loading}
+                  className="w-full py-2 text-sm text-blue-600 hover:text-blue-800 hover:bg-white/50 rounded-lg disabled:opacity-50"
+                >
+                  {loading ? 'Loading...' : `Load more (${requests.length} of ${total})`}
+                </button>
+              )}
+            </>
           )}
         </div>
       </div>
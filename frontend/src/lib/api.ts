@@ -1,6 +1,6 @@
 import axios from 'axios'
 
-const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
+export const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
 
 const axiosInstance = axios.create({
   baseURL: API_BASE_URL,
@@ -74,6 +74,14 @@ export const api = {
     return data
   },
 
+  // Analytics
+  getAnalyticsSummary: async (filters?: any) => {
+    const { data } = await axiosInstance.get('/api/analytics/summary', {
+      params: filters
+    })
+    return data
+  },
+
   // Categories
   getCategories: async () => {
     const { data } = await axiosInstance.get('/api/categories')
@@ -124,9 +132,9 @@ export const api = {
   },
 
   // Equipment
-  getEquipment: async (activeOnly = true) => {
+  getEquipment: async (activeOnly = true, include?: string) => {
     const { data } = await axiosInstance.get('/api/equipment', {
-      params: { active_only: activeOnly }
+      params: { active_only: activeOnly, include }
     })
     return data
   },
@@ -177,6 +185,24 @@ export const api = {
     return data
   },
 
+  // Calendar
+  getCalendar: async (start: string, end: string, filters?: any) => {
+    const { data } = await axiosInstance.get('/api/calendar', {
+      params: { start, end, ...filters }
+    })
+    return data
+  },
+
+  // Kanban
+  getKanban: async (params?: any) => {
+    const { data } = await axiosInstance.get('/api/kanban', { params })
+    return data
+  },
+  getKanbanColumn: async (stageId: number, params?: any) => {
+    const { data } = await axiosInstance.get(`/api/kanban/${stageId}`, { params })
+    return data
+  },
+
   // Maintenance Requests
   getRequests: async (filters?: any) => {
     const { data } = await axiosInstance.get('/api/requests', {
@@ -196,10 +222,22 @@ export const api = {
     const { data } = await axiosInstance.put(`/api/requests/${id}`, request)
     return data
   },
+  bulkUpdateRequests: async (body: any) => {
+    const { data } = await axiosInstance.patch('/api/requests/bulk', body)
+    return data
+  },
   assignRequestToMe: async (id: number) => {
     const { data } = await axiosInstance.post(`/api/requests/${id}/assign-to-me`)
     return data
   },
+
+  // Search
+  search: async (q: string, type: 'all' | 'request' | 'equipment' = 'all', limit = 20) => {
+    const { data } = await axiosInstance.get('/api/search', {
+      params: { q, type, limit }
+    })
+    return data
+  },
 }
 
 export default api
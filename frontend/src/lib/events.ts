@@ -0,0 +1,90 @@
+'use client'
+
+import { useEffect, useRef } from 'react'
+import { QueryKey, useQueryClient } from '@tanstack/react-query'
+import { API_BASE_URL } from './api'
+
+// Change pushed by GET /api/events
+export interface ChangeEvent {
+  type: string // request.created, request.updated, equipment.scrapped
+  id: number
+  stage_id: number | null
+  team_ids: number[]
+  changes: Record<string, any>
+}
+
+// Card fields that are joined in from other tables and go stale when their id changes
+const JOINED_FIELDS = ['equipment_id', 'technician_id']
+
+// Subscribe to live changes; `onEvent(null)` means events were missed and data should be refetched
+export function useChangeEvents(onEvent: (event: ChangeEvent | null) => void, teamId?: number) {
+  const handler = useRef(onEvent)
+  handler.current = onEvent
+
+  useEffect(() => {
+    const params = teamId ? `?team_id=${teamId}` : ''
+    const source = new EventSource(`${API_BASE_URL}/api/events${params}`)
+    source.onmessage = (message) => handler.current(JSON.parse(message.data))
+    source.addEventListener('resync', () => handler.current(null))
+    return () => source.close()
+  }, [teamId])
+}
+
+// Refetch a query after changes, at most once per `delayMs`
+export function useRefetchOnChange(queryKey: QueryKey, delayMs = 0) {
+  const queryClient = useQueryClient()
+  const timer = useRef<ReturnType<typeof setTimeout> | null>(null)
+
+  useEffect(() => () => {
+    if (timer.current) clearTimeout(timer.current)
+  }, [])
+
+  useChangeEvents(() => {
+    if (timer.current) return
+    timer.current = setTimeout(() => {
+      timer.current = null
+      queryClient.invalidateQueries({ queryKey })
+    }, delayMs)
+  })
+}
+
+function sortCards(cards: any[]) {
+  return cards.sort((a, b) => (b.priority ?? '').localeCompare(a.priority ?? '') || a.id - b.id)
+}
+
+// Apply a request event to the cached kanban board; null means the board must be refetched
+export function applyToKanban(stages: any[], event: ChangeEvent): any[] | null {
+  if (event.type !== 'request.updated') return null
+  if (JOINED_FIELDS.some((field) => field in event.changes)) return null
+
+  const from = stages.find((stage) => stage.cards.some((card: any) => card.id === event.id))
+  if (!from) return null
+  const card = { ...from.cards.find((c: any) => c.id === event.id) }
+  for (const [field, value] of Object.entries(event.changes)) {
+    if (field in card) card[field] = value
+  }
+
+  const to = event.changes.active === false ? null : stages.find((stage) => stage.id === card.stage_id)
+  if (card.stage_id !== from.id && to === undefined) return null
+
+  return stages.map((stage) => {
+    if (stage !== from && stage !== to) return stage
+    let cards = stage.cards.filter((c: any) => c.id !== event.id)
+    let count = stage.count
+    if (stage === from) count -= 1
+    if (stage === to) {
+      cards = sortCards([...cards, card])
+      count += 1
+      // Cards past the loaded page arrive with the next cursor
+      if (stage.next_cursor && cards[cards.length - 1] === card) cards.pop()
+    }
+    return { ...stage, cards, count }
+  })
+}
+
+// Apply a request event to a cached request list; null means the list must be refetched
+export function applyToRequests(requests: any[], event: ChangeEvent): any[] | null {
+  if (event.type !== 'request.updated') return null
+  if (!requests.some((request) => request.id === event.id)) return null
+  return requests.map((request) => (request.id === event.id ? { ...request, ...event.changes } : request))
+}